@@ -1,47 +1,39 @@
+"""
+Streamlit app: upload a statement, view the parsed data and download it.
+
+TransactionTable (numpy/pandas) is imported once there is data to show, so
+a cold start only pays for Streamlit and the parsing modules' light imports.
+"""
 import streamlit as st
-import os
-import tempfile
 import json
-import pandas as pd
+import os
+from io import BytesIO
 
 # Import your existing parsing functions from the 'modules' subfolder
-from modules.pdf_reader import read_pdf
-from modules.text_parser import clean_text, extract_key_fields
-from modules.table_extractor import extract_transactions
+from modules.pipeline import parse_statement
+from modules.cache import CACHE_DIR_ENV, ResultCache
+from modules.instrumentation import PipelineMetrics
 from modules.report_generator import generate_summary_pdf  # Removed unused save_json_output
 
-def run_parser(pdf_path):
+@st.cache_resource
+def get_result_cache():
     """
-    Runs the complete parsing pipeline on the temporary PDF file.
+    One ResultCache shared by every session of this Streamlit server. It is
+    memory-only unless CACHE_DIR_ENV names a directory for the disk tier, so
+    read-only deployments never try to create .statement_cache.
     """
-    
-    # Step 1: Read PDF
-    raw_text = read_pdf(pdf_path)
-    if not raw_text:
+    return ResultCache(os.environ.get(CACHE_DIR_ENV) or None)
+
+def run_parser(pdf_bytes, metrics=None):
+    """
+    Runs the complete parsing pipeline on the uploaded PDF, straight from
+    memory (no temporary file unless the Camelot fallback needs one).
+    Repeat uploads of the same PDF are served from the result cache.
+    """
+    structured_data = parse_statement(pdf_bytes, cache=get_result_cache(), metrics=metrics)
+    if structured_data is None:
         st.error("Step 1 Failed: Could not read text from PDF.")
         return None
-
-    # Step 2: Clean Text
-    cleaned_text = clean_text(raw_text)
-    
-    # Step 3: Extract Key Fields
-    key_fields = extract_key_fields(cleaned_text)
-
-    # Step 4: Extract Transactions
-    transactions = extract_transactions(pdf_path)
-
-    # Step 5: Structure Data
-    structured_data = {
-        "card_last4": key_fields.get("card_last4"),
-        "statement_period": {
-            "from": key_fields.get("statement_period_from"),
-            "to": key_fields.get("statement_period_to")
-        },
-        "payment_due_date": key_fields.get("payment_due_date"),
-        "total_due": key_fields.get("total_due"),
-        "minimum_due": key_fields.get("minimum_due"),
-        "transactions": transactions
-    }
     
     return structured_data
 
@@ -54,17 +46,14 @@ st.write("Upload your PDF statement to extract key information and transactions.
 uploaded_file = st.file_uploader("Choose a PDF file", type="pdf")
 
 if uploaded_file is not None:
-    # Create a temporary file to save the upload
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp.write(uploaded_file.getvalue())
-        tmp_pdf_path = tmp.name
-
     try:
         with st.spinner("Parsing statement... this may take a moment."):
             # Run the full parsing pipeline
-            data = run_parser(tmp_pdf_path)
+            metrics = PipelineMetrics(uploaded_file.name)
+            data = run_parser(uploaded_file.getvalue(), metrics)
         
         if data:
+            from modules.columnar import TransactionTable
             st.success("Successfully parsed the statement!")
 
             # --- Display Data ---
@@ -101,17 +90,30 @@ if uploaded_file is not None:
                 except Exception as pdf_error:
                     st.error(f"Could not generate PDF summary. Error: {pdf_error}")
 
+                # 3. Download Parquet (typed, columnar; needs pyarrow)
+                try:
+                    parquet_buffer = BytesIO()
+                    TransactionTable.from_records(data['transactions']).write_parquet(
+                        parquet_buffer, {k: v for k, v in data.items() if k != 'transactions'})
+                    st.download_button(
+                        label="Download Transactions (.parquet)",
+                        data=parquet_buffer.getvalue(),
+                        file_name="statement_output.parquet",
+                        mime="application/vnd.apache.parquet",
+                    )
+                except ImportError:
+                    pass
+
+                # 4. Where the time went
+                with st.expander("Parse timing"):
+                    st.json(metrics.record)
+
             with col2:
                 st.subheader(f"Transactions ({len(data['transactions'])})")
-                df = pd.DataFrame(data['transactions'])
+                df = TransactionTable.from_records(data['transactions']).to_frame()
                 st.dataframe(df, use_container_width=True, height=500)
 
     except Exception as e:
         st.error(f"An error occurred during parsing: {e}")
         st.exception(e) # Show the full traceback for debugging
 
-    finally:
-        # Clean up the temporary file
-        if os.path.exists(tmp_pdf_path):
-            os.remove(tmp_pdf_path)
-
@@ -0,0 +1,131 @@
+"""
+Cold-start benchmark: import cost of each entry point, from `python -X importtime`.
+
+Every target is imported in a fresh interpreter several times; the median
+total import time is reported along with the heaviest top-level imports and
+which of the heavy optional libraries got loaded. Results are saved as JSON
+and can be compared against a baseline like bench_pipeline.py:
+
+    python benchmarks/bench_import.py --out benchmarks/import_baseline.json
+    python benchmarks/bench_import.py --compare benchmarks/import_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# name -> code run with -X importtime (cwd = repo root)
+TARGETS = {
+    "main-orc --help": "import runpy, sys; sys.argv = ['main-orc.py', '--help']\n"
+                       "try: runpy.run_path('main-orc.py', run_name='__main__')\n"
+                       "except SystemExit: pass",
+    "modules.pipeline": "import modules.pipeline",
+    "modules.table_extractor": "import modules.table_extractor",
+    "modules.report_generator": "import modules.report_generator",
+    "modules.batch": "import modules.batch",
+    "server": "import server",
+}
+
+# Libraries that should only load when their engine / feature is used
+HEAVY = ("fitz", "pandas", "camelot", "cv2", "reportlab.pdfgen", "pyarrow")
+
+
+def parse_importtime(stderr):
+    """
+    Parses -X importtime output into (total_us, {top-level module: cumulative_us}, loaded names).
+    Top-level entries are the ones with no indentation in the module column.
+    """
+    top = {}
+    loaded = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        module = name.strip()
+        loaded.add(module)
+        if not name[1:].startswith(" "):
+            top[module] = int(cumulative)
+    return sum(top.values()), top, loaded
+
+
+def bench_target(code, repeat):
+    totals = []
+    top = loaded = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                              capture_output=True, text=True)
+        total, top, loaded = parse_importtime(proc.stderr)
+        totals.append(total)
+    heaviest = sorted(top.items(), key=lambda kv: -kv[1])[:5]
+    return {
+        "median_ms": statistics.median(totals) / 1000,
+        "min_ms": min(totals) / 1000,
+        "heaviest": [{"module": m, "ms": us / 1000} for m, us in heaviest],
+        "heavy_loaded": [h for h in HEAVY if h in loaded],
+    }
+
+
+def compare(results, baseline_path, threshold):
+    """Prints current/baseline ratios; returns the number of regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["target"]: r for r in json.load(f)["results"]}
+    regressions = 0
+    for r in results:
+        base = baseline.get(r["target"])
+        if not base or base["median_ms"] <= 0:
+            continue
+        ratio = r["median_ms"] / base["median_ms"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  <-- REGRESSION"
+            regressions += 1
+        print(f"{r['target']:>26}: {base['median_ms']:8.1f}ms -> {r['median_ms']:8.1f}ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of each entry point")
+    parser.add_argument("--targets", nargs="+", choices=sorted(TARGETS), default=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="Write results JSON here (e.g. benchmarks/import_baseline.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a saved results JSON")
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="Slowdown ratio reported as a regression (default 1.5)")
+    args = parser.parse_args()
+
+    results = []
+    for target in args.targets:
+        r = dict(bench_target(TARGETS[target], args.repeat), target=target)
+        results.append(r)
+        print(f"{target:>26}: {r['median_ms']:8.1f}ms  heavy: {', '.join(r['heavy_loaded']) or '-'}"
+              f"  top: {', '.join(h['module'] for h in r['heaviest'][:3])}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"Results saved to {args.out}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"{regressions} target(s) slower than x{args.threshold} of baseline.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
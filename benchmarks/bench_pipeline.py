@@ -0,0 +1,190 @@
+"""
+Stage-by-stage benchmark of the parsing pipeline on synthetic statements.
+
+Generates statements with example.create_statement() across a grid of sizes
+and layouts, then times read_pdf, clean_text, extract_key_fields,
+extract_transactions and generate_summary_pdf. Results are written as JSON
+so they can be kept as a baseline and compared against later runs:
+
+    python benchmarks/bench_pipeline.py --out benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from example import create_statement, LAYOUTS  # noqa: E402
+from modules.pdf_reader import read_pdf  # noqa: E402
+from modules.text_parser import clean_text, extract_key_fields  # noqa: E402
+from modules.table_extractor import extract_transactions, ENGINES  # noqa: E402
+from modules.pipeline import structure_data  # noqa: E402
+from modules.report_generator import generate_summary_pdf  # noqa: E402
+from modules.supervisor import rss_bytes  # noqa: E402
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+# (transactions, noise_pages) per size class
+SIZES = {
+    "small": [(6, 0), (200, 2)],
+    "medium": [(6, 0), (200, 2), (2000, 10)],
+    "large": [(6, 0), (200, 2), (2000, 10), (10000, 40)],
+}
+
+STAGES = ("read_pdf", "clean_text", "extract_key_fields", "extract_transactions", "generate_summary_pdf")
+
+
+def max_rss_kib():
+    """Peak RSS of this process in KiB (current RSS where getrusage is unavailable, e.g. Windows)."""
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = rss_bytes()
+    return rss // 1024 if rss is not None else None
+
+
+def _stage_calls(pdf_path, engine):
+    """
+    Returns (name, callable) pairs; each callable receives the outputs of the
+    previous stages so every stage is timed on its real input.
+    """
+    state = {}
+
+    def read():
+        state["raw"] = read_pdf(pdf_path)
+
+    def clean():
+        state["cleaned"] = clean_text(state["raw"])
+
+    def fields():
+        state["fields"] = extract_key_fields(state["cleaned"])
+
+    def transactions():
+        state["transactions"] = extract_transactions(pdf_path, engine=engine)
+
+    def report():
+        generate_summary_pdf(structure_data(state["fields"], state["transactions"]))
+
+    return state, list(zip(STAGES, (read, clean, fields, transactions, report)))
+
+
+def bench_statement(pdf_path, engine, repeat):
+    """Median/min wall time and peak traced memory for each stage."""
+    timings = {name: [] for name in STAGES}
+    for _ in range(repeat):
+        _, calls = _stage_calls(pdf_path, engine)
+        for name, call in calls:
+            start = time.perf_counter()
+            call()
+            timings[name].append(time.perf_counter() - start)
+
+    # Separate pass for memory: tracemalloc slows everything down
+    peaks = {}
+    state, calls = _stage_calls(pdf_path, engine)
+    for name, call in calls:
+        tracemalloc.start()
+        call()
+        peaks[name] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return [{
+        "stage": name,
+        "median_s": statistics.median(timings[name]),
+        "min_s": min(timings[name]),
+        "peak_python_kib": peaks[name] // 1024,
+    } for name in STAGES], len(state.get("transactions", []))
+
+
+def run(sizes, layouts, engine, repeat, workdir):
+    results = []
+    for layout in layouts:
+        for transactions, noise_pages in sizes:
+            pdf_path = os.path.join(workdir, f"{layout}_{transactions}_{noise_pages}.pdf")
+            expected = create_statement(pdf_path, transactions=transactions, layout=layout,
+                                        noise_pages=noise_pages)
+            stages, extracted = bench_statement(pdf_path, engine, repeat)
+            print(f"{layout:>13} {transactions:>6} tx {expected['pages']:>4} pages: "
+                  + "  ".join(f"{s['stage']}={s['median_s'] * 1000:.1f}ms" for s in stages))
+            if extracted != transactions:
+                print(f"  WARNING: extracted {extracted} of {transactions} transactions")
+            for s in stages:
+                results.append(dict(s, layout=layout, transactions=transactions,
+                                    noise_pages=noise_pages, pages=expected["pages"],
+                                    extracted=extracted))
+    return results
+
+
+def _key(r):
+    return (r["layout"], r["transactions"], r["noise_pages"], r["stage"])
+
+
+def compare(results, baseline_path, threshold):
+    """Prints current/baseline ratios; returns the number of regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {_key(r): r for r in json.load(f)["results"]}
+    regressions = 0
+    for r in results:
+        base = baseline.get(_key(r))
+        if not base or base["median_s"] <= 0:
+            continue
+        ratio = r["median_s"] / base["median_s"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  <-- REGRESSION"
+            regressions += 1
+        print(f"{r['layout']:>13} {r['transactions']:>6} {r['stage']:>22}: "
+              f"{base['median_s'] * 1000:9.2f}ms -> {r['median_s'] * 1000:9.2f}ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each pipeline stage on synthetic statements")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--layouts", nargs="+", choices=sorted(LAYOUTS), default=sorted(LAYOUTS))
+    parser.add_argument("--engine", choices=ENGINES, default="auto")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="Write results JSON here (e.g. benchmarks/baseline.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a saved results JSON")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Slowdown ratio reported as a regression (default 1.25)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run(SIZES[args.size], args.layouts, args.engine, args.repeat, workdir)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "engine": args.engine,
+            "repeat": args.repeat,
+            "max_rss_kib": max_rss_kib(),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"Results saved to {args.out}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"{regressions} stage(s) slower than x{args.threshold} of baseline.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,9 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import Table, TableStyle
 from reportlab.lib import colors
+import argparse
 import os
+import random
 
 def create_pdf(file_path):
     """
@@ -57,7 +59,192 @@ def create_pdf(file_path):
     c.save()
     print(f"Successfully created fake PDF: '{file_path}'")
 
+
+# --- Parametrized generator for realistic sizes (used by benchmarks/) ---
+
+# Each layout mimics a different issuer: header labels, masking style and
+# transaction-table columns. Column positions are x offsets in points.
+LAYOUTS = {
+    "global_trust": {
+        "bank": "Global Trust Bank",
+        "card": "Account Number: **** **** **** {last4}",
+        "period": "Statement Period: {start} - {end}",
+        "due_date": "Payment Due Date: {due}",
+        "total": "Total Amount Due: ${total}",
+        "minimum": "Minimum Payment: ${minimum}",
+        "columns": [("Date", 50), ("Transaction Details", 150), ("Amount", 450)],
+    },
+    "metro_card": {
+        "bank": "Metro Card Services",
+        "card": "Card Number: XXXX-XXXX-XXXX-{last4}",
+        "period": "Statement Period {start} to {end}",
+        "due_date": "Payment Due Date {due}",
+        "total": "New Balance {total}",
+        "minimum": "Minimum Amount Due {minimum}",
+        "columns": [("Txn Date", 40), ("Description", 120), ("Ref No", 380), ("Amount", 480)],
+    },
+    "coastal": {
+        "bank": "Coastal Credit Union",
+        "card": "Account No: XXXXXXXXXXXX{last4}",
+        "period": "Statement Period: {start} to {end}",
+        "due_date": "Payment Due Date: {due}",
+        "total": "Total Amount Due: ${total}",
+        "minimum": "Minimum Payment Due: ${minimum}",
+        "columns": [("Posting Date", 40), ("Transaction Date", 120), ("Details", 210), ("Amount", 490)],
+    },
+}
+
+MERCHANTS = [
+    "Amazon Purchase", "Starbucks", "Gas Station", "Grocery Store", "Restaurant",
+    "Uber Trip", "Netflix Subscription", "Pharmacy", "Airline Tickets", "Hotel Booking",
+    "Electronics Store", "Book Shop", "Cinema", "Parking Garage", "Utility Bill",
+]
+
+NOISE_TEXT = (
+    "Important information about your account. Rewards points are credited within "
+    "two billing cycles. Terms and conditions apply to all offers described here. "
+    "Please read the enclosed disclosures carefully and keep them for your records."
+)
+
+
+def _draw_table_header(c, columns, y):
+    c.setFont('Helvetica-Bold', 10)
+    for label, x in columns:
+        c.drawString(x, y, label)
+    c.setFont('Helvetica', 9)
+
+
+def _draw_noise_page(c, height, page_no):
+    c.setFont('Helvetica-Bold', 14)
+    c.drawString(50, height - 72, f"Special Offers and Disclosures ({page_no})")
+    c.setFont('Helvetica', 10)
+    y = height - 110
+    while y > 72:
+        c.drawString(50, y, NOISE_TEXT[:95])
+        c.drawString(50, y - 14, NOISE_TEXT[95:190])
+        y -= 40
+    c.showPage()
+
+
+def create_statement(file_path, transactions=6, layout="global_trust", pages=None,
+                     noise_pages=0, rows_per_page=40, seed=0):
+    """
+    Generates a synthetic statement of any size.
+
+    - transactions: number of transaction rows (M)
+    - layout: one of LAYOUTS, to exercise different issuer templates
+    - noise_pages: marketing/disclosure pages without transactions; half
+      are inserted after page 1 and the rest at the end
+    - pages: minimum total page count (N); padded with extra noise pages
+    - rows_per_page: transaction rows per page (the header repeats on each)
+
+    Returns a dict of the values a correct parser should extract.
+    """
+    spec = LAYOUTS[layout]
+    rng = random.Random(seed)
+    c = canvas.Canvas(file_path, pagesize=letter)
+    width, height = letter
+
+    last4 = f"{rng.randint(0, 9999):04d}"
+    rows = []
+    for _ in range(transactions):
+        day = rng.randint(1, 30)
+        if rng.random() < 0.05:
+            rows.append((f"09/{day:02d}/2025", "Payment Received - Thank You", f"{rng.randint(50, 2000)}.00 CR"))
+        else:
+            amount = rng.randint(100, 250000)
+            rows.append((f"09/{day:02d}/2025", rng.choice(MERCHANTS), f"{amount // 100:,}.{amount % 100:02d}"))
+    # Payments (CR) reduce the balance
+    total = sum(int(r[2].split()[0].replace(",", "").replace(".", "")) * (-1 if r[2].endswith(" CR") else 1)
+                for r in rows) / 100
+
+    # The first page also carries the statement header, so it holds fewer rows
+    first_page_rows = min(rows_per_page, 30)
+    table_pages = 1 + max(0, -(-(transactions - first_page_rows) // rows_per_page))
+    if pages is not None and pages > table_pages + noise_pages:
+        noise_pages = pages - table_pages
+    noise_after_first = noise_pages // 2
+
+    expected = {
+        "card_last4": last4,
+        "statement_period_from": "09/01/2025",
+        "statement_period_to": "09/30/2025",
+        "payment_due_date": "10/20/2025",
+        "total_due": f"{total:.2f}",
+        "minimum_due": "50.00",
+        "transactions": transactions,
+        "pages": table_pages + noise_pages,
+    }
+
+    page_no = 0
+    start = 0
+    for t in range(table_pages):
+        page_no += 1
+        y = height - 60
+        if t == 0:
+            # --- Header Info (for text_parser.py) ---
+            c.setFont('Helvetica-Bold', 16)
+            c.drawString(50, y, spec["bank"])
+            c.setFont('Helvetica', 10)
+            y -= 30
+            c.drawString(50, y, spec["card"].format(last4=last4))
+            c.drawString(300, y, spec["period"].format(start="09/01/2025", end="09/30/2025"))
+            c.setFont('Helvetica-Bold', 11)
+            for key, value in (("due_date", {"due": "10/20/2025"}),
+                               ("total", {"total": f"{total:,.2f}"}),
+                               ("minimum", {"minimum": "50.00"})):
+                y -= 22
+                c.drawString(50, y, spec[key].format(**value))
+            y -= 40
+
+        # --- Transaction Table (for table_extractor.py) ---
+        _draw_table_header(c, spec["columns"], y)
+        y -= 18
+        count = first_page_rows if t == 0 else rows_per_page
+        for date, description, amount in rows[start:start + count]:
+            for label, x in spec["columns"]:
+                if "Date" in label:
+                    value = date
+                elif "Ref" in label:
+                    value = f"R{rng.randint(100000, 999999)}"
+                elif "Amount" in label:
+                    value = amount
+                else:
+                    value = description
+                c.drawString(x, y, value)
+            y -= 14
+        start += count
+        c.showPage()
+
+        if t == 0:
+            for _ in range(noise_after_first):
+                page_no += 1
+                _draw_noise_page(c, height, page_no)
+
+    for _ in range(noise_pages - noise_after_first):
+        page_no += 1
+        _draw_noise_page(c, height, page_no)
+
+    c.save()
+    return expected
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate fake credit card statements for testing.")
+    parser.add_argument("-o", "--output", help="Output path (default: ../sample_statement.pdf)")
+    parser.add_argument("--transactions", type=int, help="Generate a synthetic statement with this many rows")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="global_trust")
+    parser.add_argument("--pages", type=int, default=None)
+    parser.add_argument("--noise-pages", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
     # Save the PDF in the parent directory, where main-orc.py expects it
-    output_path = os.path.join(os.path.dirname(__file__), '..', 'sample_statement.pdf')
-    create_pdf(os.path.abspath(output_path))
+    output_path = args.output or os.path.join(os.path.dirname(__file__), '..', 'sample_statement.pdf')
+    if args.transactions is None:
+        create_pdf(os.path.abspath(output_path))
+    else:
+        info = create_statement(os.path.abspath(output_path), transactions=args.transactions,
+                                layout=args.layout, pages=args.pages,
+                                noise_pages=args.noise_pages, seed=args.seed)
+        print(f"Successfully created synthetic statement: '{output_path}' ({info['pages']} pages)")
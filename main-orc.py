@@ -1,55 +1,235 @@
 # ...existing code...
+"""
+Command line entry point: parse one statement or a batch of them.
+
+The batch, JSONL and report modules are imported by the commands that use
+them, so --help and cache hits start fast.
+"""
+import argparse
 import os
 import json
-from modules.pdf_reader import read_pdf
-from modules.text_parser import clean_text, extract_key_fields
-from modules.table_extractor import extract_transactions
-from modules.report_generator import generate_summary_pdf, save_json_output
+from modules.table_extractor import ENGINES
+from modules.pipeline import parse_statement
+from modules.cache import ResultCache, DEFAULT_CACHE_DIR
+from modules.instrumentation import PipelineMetrics, jsonl_hook, print_hook
+
+# Batches at least this large are loaded into --store with indexes rebuilt afterwards
+BULK_STORE_MIN = 1000
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Credit card statement parser")
+    parser.add_argument("pdf_path", nargs="?", default="sample_statement.pdf",
+                        help="Statement to parse (default: sample_statement.pdf)")
+    parser.add_argument("--batch", metavar="DIR_OR_GLOB",
+                        help="Parse every PDF in a directory or matching a glob, in parallel")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for --batch (default: CPU count)")
+    parser.add_argument("--out-dir", default="batch_output",
+                        help="Where --batch writes per-file JSON and batch_summary.json")
+    parser.add_argument("--incremental", action="store_true",
+                        help="--batch: only parse statements that are new or changed since the last run")
+    parser.add_argument("--manifest", metavar="PATH",
+                        help="Manifest of processed files for --incremental/--watch "
+                             "(default: <out-dir>/manifest.sqlite)")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="--incremental: also retry files whose last run failed")
+    parser.add_argument("--watch", action="store_true",
+                        help="--batch: keep polling the folder and ingest new or changed statements")
+    parser.add_argument("--interval", type=float, default=30.0,
+                        help="Seconds between --watch polls (default: 30)")
+    parser.add_argument("--doc-timeout", type=float, default=120.0, metavar="SECONDS",
+                        help="--batch: kill a worker stuck on one statement this long (0 = no limit)")
+    parser.add_argument("--max-rss-mb", type=int, default=2048, metavar="MB",
+                        help="--batch: replace a worker whose memory grows past this (0 = no limit)")
+    parser.add_argument("--max-tasks-per-worker", type=int, default=200, metavar="N",
+                        help="--batch: replace each worker after N statements (0 = never)")
+    parser.add_argument("--engine", choices=ENGINES, default="auto",
+                        help="Transaction table engine")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Directory for the on-disk result cache")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always re-parse, ignoring and not updating the result cache")
+    parser.add_argument("--parquet", action="store_true",
+                        help="Also save transactions as statement_output.parquet")
+    parser.add_argument("--arrow", action="store_true",
+                        help="Also save transactions as statement_output.arrow (Arrow IPC)")
+    parser.add_argument("--jsonl", metavar="PATH",
+                        help="Append results to a JSONL file (.gz/.zst compress); in --batch replaces per-file JSON")
+    parser.add_argument("--jsonl-per-transaction", action="store_true",
+                        help="Write one JSONL line per transaction instead of per statement")
+    parser.add_argument("--table-workers", type=int, metavar="N",
+                        help="Processes for reading long Camelot tables in page shards "
+                             "(default: 1, no sharding; not used inside --batch workers)")
+    parser.add_argument("--categories", metavar="RULES",
+                        help="Extra merchant keyword rules (.json or .csv) for categorization")
+    parser.add_argument("--dedupe", metavar="INDEX",
+                        help="Skip statements already in this fingerprint index (.npz) and drop transactions "
+                             "that overlap earlier statements; the index is updated")
+    parser.add_argument("--store", metavar="DB",
+                        help="Also load results into a SQLite transaction store (see python -m modules.store)")
+    parser.add_argument("--reports", choices=("none", "each", "consolidated"), default="none",
+                        help="--batch: render a summary PDF per statement, or one consolidated PDF")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Print per-stage timing metrics as JSON")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="Append per-stage timing metrics as JSON lines to PATH")
+    parser.add_argument("--profile-threshold", type=float, metavar="SECONDS",
+                        help="Save cProfile/tracemalloc output for documents slower than this")
+    parser.add_argument("--profile-dir", default=None,
+                        help="Where profiles are saved (default: ./profiles, or <out-dir>/profiles in --batch)")
+    return parser.parse_args()
+
+def batch_main(args):
+    from modules.batch import run_batch, watch_batch
+    from modules.report_generator import generate_summary_reports
+
+    options = dict(workers=args.workers, engine=args.engine,
+                   cache_dir=None if args.no_cache else args.cache_dir,
+                   profile_threshold=args.profile_threshold, profile_dir=args.profile_dir,
+                   jsonl_path=args.jsonl, jsonl_per_transaction=args.jsonl_per_transaction,
+                   retry_failed=args.retry_failed, doc_timeout=args.doc_timeout or None,
+                   max_rss_mb=args.max_rss_mb or None, max_tasks_per_worker=args.max_tasks_per_worker or None,
+                   index_path=args.dedupe)
+    manifest_path = args.manifest or os.path.join(args.out_dir, "manifest.sqlite")
+    # --store only ingests what this run appends to the (append-only) JSONL file
+    jsonl_offset = os.path.getsize(args.jsonl) if args.jsonl and os.path.exists(args.jsonl) else 0
+    if args.watch:
+        watch_batch(args.batch, args.out_dir, manifest_path=manifest_path, interval=args.interval, **options)
+        return
+    summary = run_batch(args.batch, args.out_dir,
+                        manifest_path=manifest_path if args.incremental else None, **options)
+    print("\n--- Batch Summary ---")
+    print(f"Files: {summary['files']}  Succeeded: {summary['succeeded']}  Failed: {summary['failed']}"
+          f"  Cache hits: {summary['cache_hits']}  Unchanged: {summary['unchanged']}")
+    if args.dedupe:
+        print(f"Duplicates skipped: {summary['duplicates']}"
+              f"  Overlapping transactions dropped: {summary['overlaps_dropped']}")
+    if summary["degraded"] or summary["failed"]:
+        print(f"Degraded (no transactions): {summary['degraded']}  Quarantined: {summary['failed']}"
+              f"  (see {os.path.join(args.out_dir, 'quarantine.jsonl')})")
+    print(f"Wall time: {summary['wall_time']:.2f}s  Throughput: {summary['throughput_per_sec']:.2f} files/s")
+    print("---------------------")
+
+    if args.store:
+        from modules.store import TransactionStore, read_jsonl
+        with TransactionStore(args.store) as store:
+            if args.jsonl:
+                if args.jsonl_per_transaction:
+                    print("Note: --store reads per-statement JSONL and is skipped with --jsonl-per-transaction.")
+                    statements = transactions = 0
+                else:
+                    statements, transactions = store.ingest(read_jsonl(args.jsonl, jsonl_offset),
+                                                            bulk=summary["succeeded"] >= BULK_STORE_MIN)
+            else:
+                statements, transactions = store.ingest(_batch_results(summary),
+                                                        bulk=summary["succeeded"] >= BULK_STORE_MIN)
+        print(f"Stored {statements} statements ({transactions} transactions) in {args.store}")
+
+    if args.jsonl:
+        print(f"Results streamed to {args.jsonl}")
+        if args.reports != "none":
+            print("Note: --reports needs per-file JSON and is skipped with --jsonl.")
+        return
+
+    outputs = [r["output"] for r in summary["per_file"] if r["ok"] and r["output"]]
+    if args.reports == "each" and outputs:
+        reports_dir = os.path.join(args.out_dir, "reports")
+        generate_summary_reports(outputs, output_dir=reports_dir, workers=args.workers)
+        print(f"Summary reports saved to {reports_dir}")
+    elif args.reports == "consolidated" and outputs:
+        report_path = os.path.join(args.out_dir, "consolidated_report.pdf")
+        generate_summary_reports(outputs, consolidated_path=report_path, workers=args.workers)
+        print(f"Consolidated report saved to {report_path}")
 
-def main():
+def _batch_results(summary):
+    """Parsed statements of a batch run, keyed to their PDF like single-file runs."""
+    for r in summary["per_file"]:
+        if r["ok"] and r["output"]:
+            with open(r["output"], encoding="utf-8") as f:
+                yield dict(json.load(f), source=os.path.abspath(r["file"]))
+
+def make_metrics(args, pdf_path):
+    """PipelineMetrics for the single-file run, or None if not requested."""
+    hooks = []
+    if args.metrics:
+        hooks.append(print_hook)
+    if args.metrics_file:
+        hooks.append(jsonl_hook(args.metrics_file))
+    if not hooks and args.profile_threshold is None:
+        return None
+    return PipelineMetrics(pdf_path, hooks=hooks, profile_threshold=args.profile_threshold,
+                           profile_dir=args.profile_dir or "profiles")
+
+def _cache_hits(cache):
+    return cache.stats["memory_hits"] + cache.stats["disk_hits"] if cache else 0
+
+def main(args):
     """
     Main function to drive the statement parsing process.
     """
-    pdf_path = 'sample_statement.pdf'
+    pdf_path = args.pdf_path
     
     if not os.path.exists(pdf_path):
         print(f"Error: '{pdf_path}' not found. Please add your sample statement to the project folder.")
         return
 
+    from modules.report_generator import (generate_summary_pdf, save_json_output,
+                                          save_parquet_output, save_arrow_output)
+
     print("--- Starting Credit Card Statement Parser ---")
-    
-    print(f"\nStep 1: Reading text from '{pdf_path}'...")
-    raw_text = read_pdf(pdf_path)
-    if not raw_text:
+
+    cache = None if args.no_cache else ResultCache(args.cache_dir)
+    metrics = make_metrics(args, pdf_path)
+    index = None
+    if args.dedupe:
+        from modules.fingerprints import FingerprintIndex
+        index = FingerprintIndex(args.dedupe)
+
+    # Steps 1-5 run in parse_statement: the result cache is checked before
+    # any PyMuPDF/Camelot work, and one open document is shared by all steps
+    print(f"\nSteps 1-5: Parsing '{pdf_path}' (engine: {args.engine})...")
+    hits = _cache_hits(cache)
+    structured_data = parse_statement(pdf_path, engine=args.engine, cache=cache, metrics=metrics, index=index)
+    if structured_data is None:
         print("Step 1: Failed. Exiting.")
         return
+    if _cache_hits(cache) > hits:
+        print("Cache hit: skipped Steps 1-5.")
+    else:
+        fields = {k: v for k, v in structured_data.items() if k not in ("transactions", "duplicate")}
+        print(f"Step 3: Fields extracted: {fields}")
+        if structured_data.get("duplicate"):
+            print(f"Duplicate statement: already ingested into {args.dedupe}. Skipped Steps 4-5, nothing written.")
+            return
+        print(f"Step 4: Extracted {len(structured_data['transactions'])} transactions.")
+
+    if index is not None:
+        structured_data, overlaps = index.ingest(structured_data)
+        if structured_data is None:
+            print(f"Duplicate statement: already ingested into {args.dedupe}. Nothing written.")
+            return
+        if overlaps:
+            print(f"Dropped {overlaps} transactions already seen in earlier statements.")
 
-    print("\nStep 2: Cleaning extracted text...")
-    cleaned_text = clean_text(raw_text)
-
-    print("\nStep 3: Extracting key fields...")
-    key_fields = extract_key_fields(cleaned_text)
-    print(f"Step 3: Fields extracted: {key_fields}")
-
-    print("\nStep 4: Extracting transactions (using Camelot)...")
-    transactions = extract_transactions(pdf_path)
-    print(f"Step 4: Extracted {len(transactions)} transactions.")
-
-    print("\nStep 5: Structuring data into final JSON...")
-    structured_data = {
-        "card_last4": key_fields.get("card_last4"),
-        "statement_period": {
-            "from": key_fields.get("statement_period_from"),
-            "to": key_fields.get("statement_period_to")
-        },
-        "payment_due_date": key_fields.get("payment_due_date"),
-        "total_due": key_fields.get("total_due"),
-        "minimum_due": key_fields.get("minimum_due"),
-        "transactions": transactions
-    }
-    
     output_json_path = "statement_output.json"
     save_json_output(structured_data, output_json_path)
+    if args.jsonl:
+        from modules.jsonl_sink import JsonlSink
+        with JsonlSink(args.jsonl, per_transaction=args.jsonl_per_transaction) as sink:
+            sink.write(structured_data, source=os.path.abspath(pdf_path))
+        print(f"JSONL output appended to {args.jsonl}")
+    if args.store:
+        from modules.store import TransactionStore
+        with TransactionStore(args.store) as store:
+            store.ingest([dict(structured_data, source=os.path.abspath(pdf_path))])
+        print(f"Transactions stored in {args.store}")
+    if args.parquet:
+        save_parquet_output(structured_data, "statement_output.parquet")
+    if args.arrow:
+        save_arrow_output(structured_data, "statement_output.arrow")
+    if index is not None:
+        # Only once every output is written, so a failed run can be repeated
+        index.save()
     
     print("\n--- Final JSON Output (Summary) ---")
     print(json.dumps({k: v for k, v in structured_data.items() if k != 'transactions'}, indent=4))
@@ -62,4 +242,15 @@ def main():
     print("\n--- Project Execution Complete ---")
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.categories:
+        # Read by categorizer.default_categorizer(), here and in batch workers
+        from modules.categorizer import RULES_ENV
+        os.environ[RULES_ENV] = os.path.abspath(args.categories)
+    if args.table_workers is not None:
+        from modules.table_extractor import TABLE_WORKERS_ENV
+        os.environ[TABLE_WORKERS_ENV] = str(args.table_workers)
+    if args.batch:
+        batch_main(args)
+    else:
+        main(args)
@@ -0,0 +1,404 @@
+import glob
+import json
+import os
+import time
+
+from modules.cache import ResultCache, hash_file
+from modules.instrumentation import PipelineMetrics, jsonl_hook
+from modules.jsonl_sink import SinkProcess
+from modules.manifest import Manifest, scan_statements
+from modules.pipeline import PARSER_VERSION, parse_statement
+from modules.supervisor import SupervisedPool
+
+# One ResultCache per worker process; the disk tier is shared through cache_dir.
+_worker_cache = None
+# Whether parsed statements go back to the parent (JSONL output) instead of
+# being written by the worker. Workers never touch the JSONL writer's queue:
+# one killed mid-put by the supervisor could leave it locked for good.
+_worker_returns_data = False
+# Read-only snapshot of the fingerprint index, when duplicates are skipped.
+_worker_index = None
+# Manifest rows are committed in groups of this many results.
+MANIFEST_COMMIT_EVERY = 100
+# Defaults for the supervised pool: seconds per document, MB of RSS per
+# worker, and documents per worker before it is replaced.
+DOC_TIMEOUT = 120.0
+MAX_WORKER_RSS_MB = 2048
+MAX_TASKS_PER_WORKER = 200
+
+
+def _init_worker(engine="auto", index_path=None, returns_data=False):
+    global _worker_returns_data, _worker_index
+    _worker_returns_data = returns_data
+    if index_path:
+        from modules.fingerprints import FingerprintIndex
+        _worker_index = FingerprintIndex(index_path)
+    # Load the PDF/table libraries up front so the first document a worker
+    # gets is timed like any other.
+    import fitz  # noqa: F401
+    import pandas  # noqa: F401
+    if engine != "pymupdf":
+        try:
+            import camelot  # noqa: F401
+        except ImportError:
+            pass
+
+
+def _get_worker_cache(cache_dir):
+    global _worker_cache
+    if cache_dir and _worker_cache is None:
+        _worker_cache = ResultCache(cache_dir)
+    return _worker_cache
+
+
+def find_statements(source):
+    """
+    Resolves a directory (searched recursively for *.pdf), a single PDF path
+    or a glob pattern into a sorted list of PDF paths.
+    """
+    if os.path.isdir(source):
+        pattern = os.path.join(source, "**", "*.pdf")
+    else:
+        pattern = source
+    return sorted(p for p in glob.glob(pattern, recursive=True)
+                  if os.path.isfile(p) and p.lower().endswith(".pdf"))
+
+
+def _output_path(pdf_path, output_dir, used_names):
+    """Picks a unique '<name>.json' for each input, even if stems repeat."""
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    name = stem
+    n = 1
+    while name in used_names:
+        n += 1
+        name = f"{stem}_{n}"
+    used_names.add(name)
+    return os.path.join(output_dir, f"{name}.json")
+
+
+def _fingerprint(pdf_path):
+    """Size, mtime and content hash of a file, for the ingestion manifest."""
+    try:
+        st = os.stat(pdf_path)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": hash_file(pdf_path)}
+    except OSError:
+        return None
+
+
+def _process_one(pdf_path, output_path, engine, cache_dir=None, profile_threshold=None, profile_dir=None,
+                 fingerprint=False, tables=True):
+    """
+    Worker: parses one statement and writes its JSON next to the others.
+    Only a small status record (with the document's stage metrics) travels
+    back to the parent process, except for JSONL output, where the parent
+    writes the statement to the sink.
+
+    With fingerprint=True the file's size/mtime/hash are taken before
+    parsing and returned for the manifest. tables=False is the degraded
+    retry: key fields only, no transaction table.
+
+    With a fingerprint index loaded, statements already in it stop after
+    their key fields, and full results go back to the parent (which owns
+    the index) to be deduplicated and written there.
+    """
+    start = time.perf_counter()
+    cache = _get_worker_cache(cache_dir)
+    metrics = PipelineMetrics(pdf_path, profile_threshold=profile_threshold,
+                              profile_dir=profile_dir or "profiles")
+    stat = _fingerprint(pdf_path) if fingerprint else None
+    try:
+        data = parse_statement(pdf_path, engine=engine, cache=cache, metrics=metrics, tables=tables,
+                               index=_worker_index)
+        if data is None:
+            raise ValueError("Could not read text from PDF.")
+        statement = None
+        if data.get("duplicate"):
+            output_path = None
+        elif _worker_returns_data or _worker_index is not None:
+            statement = data
+        else:
+            _write_output(data, pdf_path, output_path)
+        return {
+            "file": pdf_path,
+            "output": output_path,
+            "ok": True,
+            "duplicate": bool(data.get("duplicate")),
+            "statement": statement,
+            "transactions": len(data["transactions"]),
+            "degraded": not tables,
+            "cached": (metrics.record or {}).get("cache") == "hit",
+            "wall_time": time.perf_counter() - start,
+            "metrics": metrics.record,
+            "fingerprint": stat,
+        }
+    except Exception as e:
+        return {
+            "file": pdf_path,
+            "output": None,
+            "ok": False,
+            "error": f"{type(e).__name__}: {e}",
+            "wall_time": time.perf_counter() - start,
+            "metrics": metrics.record,
+            "fingerprint": stat,
+        }
+
+
+def _write_output(data, pdf_path, output_path, sink=None):
+    if sink is not None:
+        # Absolute, like the 'source' of per-file and single-file results
+        sink.put(data, os.path.abspath(pdf_path))
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4)
+
+
+def _deduplicate(index, result, statement, sink):
+    """
+    Parent side of the fingerprint index: drops duplicates and overlaps,
+    then writes the result. Degraded results (key fields only) are checked
+    against the index but not recorded in it, so they never mark the full
+    statement as seen before it has been parsed with its transactions.
+    """
+    if result.get("degraded"):
+        data = None if index.is_duplicate(statement) else statement
+    else:
+        data, result["overlaps"] = index.ingest(statement)
+    if data is None:
+        result["duplicate"] = True
+        result["output"] = None
+        return
+    result["transactions"] = len(data["transactions"])
+    _write_output(data, result["file"], result["output"], sink)
+
+
+def _record_in_manifest(manifest, result, index=None):
+    stat = result.pop("fingerprint", None)
+    if manifest is None:
+        return
+    if stat is None:
+        # The worker was killed before it could report one
+        stat = _fingerprint(result["file"])
+        if stat is None:
+            return
+    if result.get("quarantined"):
+        status = "quarantined"
+    elif not result["ok"]:
+        status = "failed"
+    elif result.get("duplicate"):
+        status = "duplicate"
+    else:
+        status = "degraded" if result.get("degraded") else "ok"
+    manifest.record(result["file"], stat["size"], stat["mtime_ns"], stat["sha256"],
+                    status, output=result["output"], error=result.get("error"))
+    # Commit in groups so an interrupted run keeps most of its progress. The
+    # index is saved first: a file the manifest calls done must never be
+    # missing from the index, or its duplicates would get through later.
+    if manifest.uncommitted >= MANIFEST_COMMIT_EVERY:
+        if index is not None:
+            index.save()
+        manifest.commit()
+
+
+def _quarantine(output_dir, result, first_error):
+    """Appends a file that failed both attempts to output_dir/quarantine.jsonl."""
+    result["quarantined"] = True
+    result["error"] = f"{first_error}; degraded retry: {result['error']}"
+    entry = {"file": result["file"], "error": result["error"], "time": time.time()}
+    with open(os.path.join(output_dir, "quarantine.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def _run_jobs(jobs, workers, engine, cache_dir, profile_threshold, profile_dir, sink, write_metrics, results,
+              manifest=None, output_dir=".", limits=None, index=None):
+    """
+    Runs the jobs in a supervised pool, appending each status record to results.
+
+    A document that fails, hangs past the timeout or blows the memory limit
+    is retried once in degraded mode (no tables); if that fails too it is
+    quarantined. Returns the pool's (recycled, killed, failed to start)
+    worker counts.
+
+    With a FingerprintIndex, workers skip statements already in it (as of
+    the start of the run) and the rest are deduplicated here as they arrive.
+    """
+    if not jobs:
+        return 0, 0, 0
+    first_errors = {}
+    initargs = (engine, index.path if index is not None else None, sink is not None)
+    with SupervisedPool(workers, initializer=_init_worker, initargs=initargs,
+                        **(limits or {})) as pool:
+        for p, out in jobs:
+            pool.submit((p, out, True), _process_one, p, out, engine, cache_dir,
+                        profile_threshold, profile_dir, manifest is not None)
+        for (p, out, tables), result, error, wall_time in pool.results():
+            if error is not None:
+                # Killed or crashed: no result or metrics came back from the worker
+                result = {"file": p, "output": None, "ok": False, "error": error, "wall_time": wall_time,
+                          "metrics": {"document": p, "status": "killed", "error": error,
+                                      "wall_time": wall_time, "tables": tables}}
+            record = result.pop("metrics", None)
+            if record is not None:
+                write_metrics(record)
+            statement = result.pop("statement", None)
+            if statement is not None:
+                if index is not None:
+                    _deduplicate(index, result, statement, sink)
+                else:
+                    _write_output(statement, p, out, sink)
+            if not result["ok"]:
+                if tables:
+                    first_errors[p] = result["error"]
+                    print(f"{p}: {result['error']}; retrying without tables")
+                    pool.submit((p, out, False), _process_one, p, out, engine, cache_dir,
+                                profile_threshold, profile_dir, manifest is not None, False)
+                    continue
+                _quarantine(output_dir, result, first_errors.pop(p))
+            elif not tables:
+                result["error"] = first_errors.pop(p)
+            _record_in_manifest(manifest, result, index)
+            results.append(result)
+            if result.get("duplicate"):
+                status = "duplicate, skipped"
+            elif result["ok"]:
+                status = "ok (degraded, no transactions)" if result.get("degraded") else "ok"
+            else:
+                status = f"QUARANTINED ({result['error']})"
+            print(f"[{len(results)}/{len(jobs)}] {result['file']}: {status}")
+        return pool.recycled, pool.killed, pool.spawn_failures
+
+
+def run_batch(source, output_dir, workers=None, engine="auto", cache_dir=None,
+              profile_threshold=None, profile_dir=None, jsonl_path=None, jsonl_per_transaction=False,
+              manifest_path=None, retry_failed=False, settle=0.0,
+              doc_timeout=DOC_TIMEOUT, max_rss_mb=MAX_WORKER_RSS_MB, max_tasks_per_worker=MAX_TASKS_PER_WORKER,
+              index_path=None):
+    """
+    Parses every statement matched by 'source' across a process pool.
+
+    Each statement's JSON is written to output_dir by the worker that parsed
+    it, and a run summary (throughput, failures, per-file wall time) is saved
+    as output_dir/batch_summary.json and returned.
+
+    With cache_dir set, unchanged statements are served from the result cache.
+    Per-document stage metrics are appended to output_dir/metrics.jsonl; with
+    profile_threshold set, slow documents also get cProfile/tracemalloc dumps.
+
+    With jsonl_path set, results are streamed into one JSONL file (one line
+    per statement, or per transaction) by a single writer process instead
+    of being written as per-file JSON; workers send them back to this
+    process, which is the only one feeding the writer.
+
+    With manifest_path set, the run is incremental: only statements that are
+    new or changed since they were last recorded in the manifest (or parsed
+    by an older parser version) are processed, and their outcome is recorded.
+
+    Workers are supervised: a document gets doc_timeout seconds, a worker
+    is replaced when its RSS exceeds max_rss_mb or after
+    max_tasks_per_worker documents (None/0 disables each limit). Documents
+    that fail are retried once without tables; those that fail again are
+    listed in output_dir/quarantine.jsonl and in the summary.
+
+    With index_path set (a fingerprints.FingerprintIndex file), statements
+    already ingested are skipped (before table extraction when the index
+    knew them at the start of the run), transactions seen in earlier
+    statements are dropped from the output, and the index is updated.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    manifest = None
+    unchanged = 0
+    used_names = set()
+    previous_outputs = {}
+    if manifest_path:
+        manifest = Manifest(manifest_path, PARSER_VERSION)
+        known = manifest.entries()
+        pdf_paths, unchanged = manifest.pending(scan_statements(source), retry_failed=retry_failed, settle=settle)
+        # Changed files keep their earlier output; new ones avoid every name in use
+        previous_outputs = {p: known[p][5] for p in pdf_paths
+                            if p in known and (known[p][5] or "").endswith(".json")}
+        used_names = {os.path.splitext(os.path.basename(o))[0] for o in manifest.outputs()}
+    else:
+        pdf_paths = find_statements(source)
+
+    if jsonl_path:
+        jobs = [(p, jsonl_path) for p in pdf_paths]
+    else:
+        jobs = [(p, previous_outputs.get(p) or _output_path(p, output_dir, used_names)) for p in pdf_paths]
+
+    write_metrics = jsonl_hook(os.path.join(output_dir, "metrics.jsonl"))
+    profile_dir = profile_dir or os.path.join(output_dir, "profiles")
+
+    results = []
+    start = time.perf_counter()
+    sink = SinkProcess(jsonl_path, per_transaction=jsonl_per_transaction) if jsonl_path and jobs else None
+    limits = dict(timeout=doc_timeout, max_rss_mb=max_rss_mb, max_tasks=max_tasks_per_worker)
+    index = None
+    if index_path:
+        from modules.fingerprints import FingerprintIndex
+        index = FingerprintIndex(index_path)
+    try:
+        recycled, killed, spawn_failures = _run_jobs(jobs, workers, engine, cache_dir, profile_threshold, profile_dir,
+                                     sink, write_metrics, results, manifest, output_dir, limits, index)
+    finally:
+        if index is not None:
+            index.save()
+        if sink is not None:
+            sink.close()
+        if manifest is not None:
+            manifest.close()
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda r: r["file"])
+    failures = [r for r in results if not r["ok"]]
+    summary = {
+        "source": source,
+        "workers": workers,
+        "engine": engine,
+        "files": len(results),
+        "succeeded": len(results) - len(failures),
+        "failed": len(failures),
+        "cache_hits": sum(1 for r in results if r.get("cached")),
+        "unchanged": unchanged,
+        "degraded": sum(1 for r in results if r.get("degraded")),
+        "duplicates": sum(1 for r in results if r.get("duplicate")),
+        "overlaps_dropped": sum(r.get("overlaps", 0) for r in results),
+        "workers_recycled": recycled,
+        "workers_killed": killed,
+        "worker_start_failures": spawn_failures,
+        "wall_time": elapsed,
+        "throughput_per_sec": len(results) / elapsed if elapsed > 0 else 0.0,
+        "failures": [{"file": r["file"], "error": r["error"]} for r in failures],
+        "per_file": [{"file": r["file"], "output": r["output"], "ok": r["ok"], "degraded": bool(r.get("degraded")),
+                      "duplicate": bool(r.get("duplicate")), "wall_time": r["wall_time"]} for r in results],
+    }
+
+    if manifest is not None and not jobs:
+        # Incremental run with nothing to do: keep the last real summary
+        return summary
+
+    summary_path = os.path.join(output_dir, "batch_summary.json")
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=4)
+    print(f"Batch summary saved to {summary_path}")
+    return summary
+
+
+def watch_batch(source, output_dir, manifest_path=None, interval=30.0, settle=5.0, **kwargs):
+    """
+    Polls 'source' every 'interval' seconds and runs an incremental batch
+    over whatever is new or changed, until interrupted. Files modified in
+    the last 'settle' seconds wait for the next pass. Extra keyword
+    arguments are passed to run_batch.
+    """
+    manifest_path = manifest_path or os.path.join(output_dir, "manifest.sqlite")
+    print(f"Watching '{source}' every {interval:g}s (Ctrl+C to stop)...")
+    try:
+        while True:
+            summary = run_batch(source, output_dir, manifest_path=manifest_path, settle=settle, **kwargs)
+            if summary["files"]:
+                print(f"Processed {summary['files']} new/changed statements "
+                      f"({summary['failed']} failed, {summary['unchanged']} unchanged).")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = ".statement_cache"
+# Set to a directory to give the Streamlit app a disk tier (memory only by default).
+CACHE_DIR_ENV = "STATEMENT_CACHE_DIR"
+
+
+def hash_file(file_path, chunk_size=1 << 20):
+    """SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_bytes(data):
+    """SHA-256 of an in-memory PDF."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_key(content_hash, version_tag):
+    """Cache key: content hash plus a parser-version tag, so upgrades miss."""
+    return f"{content_hash}-{version_tag}"
+
+
+class ResultCache:
+    """
+    Two-tier cache of parsed statements keyed by content hash.
+
+    - Memory tier: LRU of serialized JSON, bounded by total bytes.
+    - Disk tier: one '<key>.json' per entry in cache_dir, bounded by total
+      bytes; the least recently used files (by mtime) are evicted first.
+
+    Entries are stored as JSON text, so every hit hands back a fresh copy
+    that callers are free to modify. Safe to share between threads; several
+    processes may share one cache_dir because files are written atomically.
+
+    With cache_dir=None, or a cache_dir that can't be created or written
+    (e.g. a read-only deployment), only the memory tier is used.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_memory_bytes=64 * 1024 * 1024,
+                 max_disk_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None  # computed lazily on first disk write
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+            except OSError:
+                pass
+            if not os.access(cache_dir, os.W_OK):
+                self.cache_dir = None
+
+    def get(self, key):
+        """Returns the cached structured data for key, or None on a miss."""
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return json.loads(payload)
+
+        payload = self._read_disk(key)
+        with self._lock:
+            if payload is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            self._remember(key, payload)
+        return json.loads(payload)
+
+    def put(self, key, data):
+        """Stores structured data in both tiers."""
+        payload = json.dumps(data, separators=(",", ":"))
+        with self._lock:
+            self._remember(key, payload)
+        self._write_disk(key, payload)
+
+    def info(self):
+        """Hit/miss counters plus current tier sizes."""
+        with self._lock:
+            return dict(self.stats,
+                        memory_entries=len(self._memory),
+                        memory_bytes=self._memory_bytes,
+                        disk_bytes=self._disk_bytes)
+
+    # --- Memory tier (caller holds the lock) ---
+
+    def _remember(self, key, payload):
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        if len(payload) > self.max_memory_bytes:
+            return
+        self._memory[key] = payload
+        self._memory_bytes += len(payload)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats["evictions"] += 1
+
+    # --- Disk tier ---
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = f.read()
+            os.utime(path)  # mark as recently used for eviction
+            return payload
+        except OSError:
+            return None
+
+    def _write_disk(self, key, payload):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            old_size = os.path.getsize(path)  # a rewritten key replaces its old file
+        except OSError:
+            old_size = 0
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Cache: could not write {path}: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+            else:
+                self._disk_bytes += len(payload) - old_size
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _disk_entries(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _evict_disk(self):
+        # Re-scan so files written by other processes are accounted for
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.stats["evictions"] += 1
+        self._disk_bytes = total
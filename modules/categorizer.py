@@ -0,0 +1,278 @@
+"""
+Merchant categorization and credit/debit classification.
+
+The keyword dictionary is compiled once into an Aho-Corasick automaton, so
+each description is classified in one pass over its characters no matter
+how many keywords there are (tens of thousands are fine). Keywords match
+whole words of the normalized description (text_parser.normalize_description);
+when several match, the longest wins ('uber eats' beats 'uber'), then the
+earliest rule. Results are memoized per distinct description, since the
+same merchants repeat across millions of rows.
+"""
+import csv
+import hashlib
+import json
+import os
+from collections import deque
+
+from modules.text_parser import normalize_description
+
+UNCATEGORIZED = "uncategorized"
+
+# Set to a JSON/CSV rules file (see load_rules) to extend the default dictionary
+# in every process, including batch workers and the HTTP service.
+RULES_ENV = "STATEMENT_CATEGORY_RULES"
+
+# keyword -> (category, type). A type of 'credit' or 'debit' decides the
+# transaction's flag unless its amount is explicitly marked (CR/DR, sign);
+# None leaves it to the amount (debit by default).
+#
+# *** EXTEND THIS FOR YOUR ISSUERS AND MERCHANTS, or load a file via RULES_ENV ***
+DEFAULT_RULES = {
+    # Money coming back to the card
+    "payment": ("payment", "credit"),
+    "payment received": ("payment", "credit"),
+    "thank you": ("payment", "credit"),
+    "autopay": ("payment", "credit"),
+    "refund": ("refund", "credit"),
+    "reversal": ("refund", "credit"),
+    "return": ("refund", "credit"),
+    "cashback": ("refund", "credit"),
+    "cash back": ("refund", "credit"),
+    "statement credit": ("refund", "credit"),
+    "fee reversal": ("refund", "credit"),
+    "fee refund": ("refund", "credit"),
+    "fee waiver": ("refund", "credit"),
+    "interest reversal": ("refund", "credit"),
+    # Charges raised by the issuer. Phrases containing 'payment' or 'return'
+    # are listed so they outrank those credit keywords by length.
+    "fee": ("fees", "debit"),
+    "fees": ("fees", "debit"),
+    "late fee": ("fees", "debit"),
+    "late payment": ("fees", "debit"),
+    "payment fee": ("fees", "debit"),
+    "returned payment": ("fees", "debit"),
+    "payment returned": ("fees", "debit"),
+    "return payment": ("fees", "debit"),
+    "returned check": ("fees", "debit"),
+    "processing fee": ("fees", "debit"),
+    "convenience fee": ("fees", "debit"),
+    "service fee": ("fees", "debit"),
+    "interest": ("fees", "debit"),
+    "annual fee": ("fees", "debit"),
+    "interest charge": ("fees", "debit"),
+    "finance charge": ("fees", "debit"),
+    "foreign transaction fee": ("fees", "debit"),
+    "cash advance": ("cash", "debit"),
+    "atm": ("cash", "debit"),
+    # Spend categories
+    "grocery": ("groceries", None),
+    "supermarket": ("groceries", None),
+    "whole foods": ("groceries", None),
+    "trader joe": ("groceries", None),
+    "walmart": ("groceries", None),
+    "costco": ("groceries", None),
+    "restaurant": ("dining", None),
+    "cafe": ("dining", None),
+    "starbucks": ("dining", None),
+    "mcdonald": ("dining", None),
+    "uber eats": ("dining", None),
+    "doordash": ("dining", None),
+    "swiggy": ("dining", None),
+    "zomato": ("dining", None),
+    "gas station": ("fuel", None),
+    "fuel": ("fuel", None),
+    "petrol": ("fuel", None),
+    "shell": ("fuel", None),
+    "chevron": ("fuel", None),
+    "airline": ("travel", None),
+    "airlines": ("travel", None),
+    "hotel": ("travel", None),
+    "airbnb": ("travel", None),
+    "uber": ("transport", None),
+    "lyft": ("transport", None),
+    "ola": ("transport", None),
+    "parking": ("transport", None),
+    "amazon": ("shopping", None),
+    "amzn": ("shopping", None),
+    "flipkart": ("shopping", None),
+    "electronics": ("shopping", None),
+    "book shop": ("shopping", None),
+    "bookstore": ("shopping", None),
+    "target": ("shopping", None),
+    "netflix": ("entertainment", None),
+    "spotify": ("entertainment", None),
+    "cinema": ("entertainment", None),
+    "movie": ("entertainment", None),
+    "pharmacy": ("health", None),
+    "hospital": ("health", None),
+    "utility": ("utilities", None),
+    "electricity": ("utilities", None),
+    "internet": ("utilities", None),
+    "mobile recharge": ("utilities", None),
+}
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a list of keywords.
+
+    best_match(text) walks the text once and returns the index of the best
+    keyword occurring in it (longest, then earliest), or -1. Every state
+    stores the best keyword ending there or on its failure chain, so no
+    per-match output lists are walked during the scan.
+    """
+
+    def __init__(self, keywords):
+        n = len(keywords)
+        # Longer keywords score higher; among equal lengths the earlier one wins
+        self.score = [len(kw) * (n + 1) + (n - i) for i, kw in enumerate(keywords)]
+        goto = [{}]
+        best = [-1]
+        for i, keyword in enumerate(keywords):
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    best.append(-1)
+                state = nxt
+            best[state] = self._better(best[state], i)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                best[nxt] = self._better(best[nxt], best[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._best = best
+
+    def _better(self, a, b):
+        if a < 0:
+            return b
+        if b < 0:
+            return a
+        return a if self.score[a] >= self.score[b] else b
+
+    def best_match(self, text):
+        goto, fail, best, score = self._goto, self._fail, self._best, self.score
+        state = 0
+        found = -1
+        found_score = -1
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            b = best[state]
+            if b >= 0 and score[b] > found_score:
+                found, found_score = b, score[b]
+        return found
+
+
+class Categorizer:
+    """
+    Classifies transaction descriptions into (category, type) with a
+    compiled keyword dictionary. type is 'credit', 'debit' or None (no
+    opinion). Unmatched descriptions get (UNCATEGORIZED, None).
+
+    'digest' identifies the compiled rules; it is part of the result cache
+    key, so results categorized with other rules are not served.
+    """
+
+    def __init__(self, rules=None, cache_size=1 << 17):
+        rules = DEFAULT_RULES if rules is None else rules
+        compiled = {}
+        for keyword, (category, type_) in rules.items():
+            words = normalize_description(keyword)
+            if words:
+                compiled[words] = (category, type_)  # later rules override earlier ones
+        # Pad with spaces so keywords only match whole words
+        self.keywords = [f" {words} " for words in compiled]
+        self.labels = list(compiled.values())
+        self.digest = hashlib.sha256(json.dumps([self.keywords, self.labels]).encode("utf-8")).hexdigest()[:12]
+        self._matcher = KeywordMatcher(self.keywords)
+        self._cache = {}
+        self.cache_size = cache_size
+
+    def classify(self, description):
+        """(category, type or None) for one description; memoized."""
+        result = self._cache.get(description)
+        if result is None:
+            index = self._matcher.best_match(f" {normalize_description(description)} ")
+            result = self.labels[index] if index >= 0 else (UNCATEGORIZED, None)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[description] = result
+        return result
+
+    def classify_series(self, descriptions):
+        """
+        Classifies a pandas Series of descriptions, looking up each distinct
+        value once. Returns (category, type) Series aligned with the input;
+        type holds None where the dictionary has no opinion.
+        """
+        import pandas as pd
+
+        codes, uniques = pd.factorize(descriptions, use_na_sentinel=False)
+        labels = [self.classify(d) for d in uniques]
+        categories = pd.Series([c for c, _ in labels], dtype=object).take(codes)
+        types = pd.Series([t for _, t in labels], dtype=object).take(codes)
+        categories.index = types.index = descriptions.index
+        return categories, types
+
+
+def load_rules(path):
+    """
+    Reads a rules file into a DEFAULT_RULES-style dict:
+      .json  {"keyword": ["category", "credit"|"debit"|null], ...}
+      .csv   keyword,category[,type] per line (no header)
+    """
+    rules = {}
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            for keyword, value in json.load(f).items():
+                category, type_ = (value, None) if isinstance(value, str) else (value[0], value[1])
+                rules[keyword] = (category, type_ or None)
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if len(row) >= 2 and row[0].strip():
+                    type_ = row[2].strip().lower() if len(row) > 2 else ""
+                    rules[row[0]] = (row[1].strip(), type_ or None)
+    return rules
+
+
+_default_categorizer = None
+
+
+def default_categorizer():
+    """The shared Categorizer: DEFAULT_RULES plus the file named by RULES_ENV, if set."""
+    global _default_categorizer
+    if _default_categorizer is None:
+        rules = dict(DEFAULT_RULES)
+        path = os.environ.get(RULES_ENV)
+        if path:
+            try:
+                rules.update(load_rules(path))
+            except (OSError, ValueError) as e:
+                print(f"Categorizer: could not load rules from {path}: {e}")
+        _default_categorizer = Categorizer(rules)
+    return _default_categorizer
+
+
+def register_rules(rules):
+    """Adds or overrides keywords in the default dictionary."""
+    global _default_categorizer
+    DEFAULT_RULES.update(rules)
+    _default_categorizer = None
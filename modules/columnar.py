@@ -0,0 +1,225 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from modules.categorizer import UNCATEGORIZED
+from modules.table_extractor import _parse_dates
+
+# Categories of the 'type' column, in code order. Code -1 is a type that
+# was neither (missing or unrecognized); it reads back as None.
+TYPES = ("debit", "credit")
+
+
+def _type_name(code):
+    return TYPES[code] if code >= 0 else None
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow export needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _encode(values):
+    """Dictionary-encodes strings: (int32 codes, list of unique values)."""
+    categorical = pd.Categorical(values)
+    return categorical.codes.astype(np.int32), list(categorical.categories)
+
+
+def _format_amounts(amount_minor):
+    return [f"{m // 100}.{m % 100:02d}" for m in amount_minor.tolist()]
+
+
+class TransactionTable:
+    """
+    Columnar store for a statement's transactions.
+
+    Each column is a typed array instead of one dict per row:
+      date          datetime64[D] (NaT where the printed date did not parse)
+      amount_minor  int64 minor units (cents/paise)
+      type          int8 codes into TYPES (-1: unknown)
+      description   int32 codes into a dictionary of unique descriptions
+      date_text     int32 codes into a dictionary of printed dates
+      category      int32 codes into a dictionary of merchant categories
+
+    Repeated merchants and dates are stored once, which is where most of the
+    memory goes in a list of dicts. Indexing or iterating yields the same
+    dicts extract_transactions() returns, so existing callers keep working.
+    """
+
+    def __init__(self, date, amount_minor, type_codes, description_codes, descriptions,
+                 date_text_codes, date_texts, category_codes=None, categories=None):
+        self.date = np.asarray(date, dtype="datetime64[D]")
+        self.amount_minor = np.asarray(amount_minor, dtype=np.int64)
+        self.type_codes = np.asarray(type_codes, dtype=np.int8)
+        self.description_codes = np.asarray(description_codes, dtype=np.int32)
+        self.descriptions = list(descriptions)
+        self.date_text_codes = np.asarray(date_text_codes, dtype=np.int32)
+        self.date_texts = list(date_texts)
+        if category_codes is None:  # tables built before categorization
+            category_codes, categories = np.zeros(len(self.amount_minor)), [UNCATEGORIZED]
+        self.category_codes = np.asarray(category_codes, dtype=np.int32)
+        self.categories = list(categories)
+
+    # --- Construction ---
+
+    @classmethod
+    def from_frame(cls, frame):
+        """From the typed frame of table_extractor.normalize_transactions()."""
+        description_codes, descriptions = _encode(frame["description"].astype(str))
+        date_text_codes, date_texts = _encode(frame["date_text"].astype(str))
+        type_codes = pd.Categorical(frame["type"].astype(str), categories=TYPES).codes
+        if "category" in frame:
+            category_codes, categories = _encode(frame["category"].astype(str))
+        else:
+            category_codes = categories = None
+        return cls(frame["date"].to_numpy().astype("datetime64[D]"),
+                   frame["amount_minor"].to_numpy(), type_codes,
+                   description_codes, descriptions, date_text_codes, date_texts,
+                   category_codes, categories)
+
+    @classmethod
+    def from_records(cls, records):
+        """From the list of transaction dicts stored in the JSON output."""
+        frame = pd.DataFrame(list(records), columns=["date", "description", "amount", "type", "category"])
+        amount = frame["amount"].astype(str).str.extract(r'^(\d*)\.?(\d*)')
+        whole = amount[0].mask(amount[0] == '', '0').astype('int64')
+        fraction = amount[1].str[:2].str.ljust(2, '0').astype('int64')
+        date_text = frame["date"].astype(str)
+        return cls.from_frame(pd.DataFrame({
+            "date": _parse_dates(date_text),
+            "date_text": date_text,
+            "description": frame["description"].astype(str),
+            "amount_minor": whole * 100 + fraction,
+            "type": frame["type"].astype(str),
+            "category": frame["category"].fillna(UNCATEGORIZED).astype(str),
+        }))
+
+    # --- Row view ---
+
+    def __len__(self):
+        return len(self.amount_minor)
+
+    def __getitem__(self, i):
+        m = int(self.amount_minor[i])
+        return {
+            "date": self.date_texts[self.date_text_codes[i]],
+            "description": self.descriptions[self.description_codes[i]],
+            "amount": f"{m // 100}.{m % 100:02d}",
+            "type": _type_name(self.type_codes[i]),
+            "category": self.categories[self.category_codes[i]],
+        }
+
+    def __iter__(self):
+        amounts = _format_amounts(self.amount_minor)
+        for i, amount in enumerate(amounts):
+            yield {
+                "date": self.date_texts[self.date_text_codes[i]],
+                "description": self.descriptions[self.description_codes[i]],
+                "amount": amount,
+                "type": _type_name(self.type_codes[i]),
+                "category": self.categories[self.category_codes[i]],
+            }
+
+    def to_records(self):
+        """The legacy list-of-dicts representation."""
+        return list(self)
+
+    @property
+    def nbytes(self):
+        arrays = (self.date, self.amount_minor, self.type_codes, self.description_codes, self.date_text_codes,
+                  self.category_codes)
+        return (sum(a.nbytes for a in arrays) + sum(len(s) for s in self.descriptions)
+                + sum(len(s) for s in self.date_texts) + sum(len(s) for s in self.categories))
+
+    # --- Conversion and export ---
+
+    def to_frame(self):
+        """Typed pandas DataFrame (categoricals share the dictionaries)."""
+        return pd.DataFrame({
+            "date": self.date.astype("datetime64[s]"),
+            "date_text": pd.Categorical.from_codes(self.date_text_codes, self.date_texts),
+            "description": pd.Categorical.from_codes(self.description_codes, self.descriptions),
+            "amount_minor": self.amount_minor,
+            "type": pd.Categorical.from_codes(self.type_codes, list(TYPES)),
+            "category": pd.Categorical.from_codes(self.category_codes, self.categories),
+        })
+
+    def to_arrow(self, metadata=None):
+        """
+        pyarrow.Table with date32 dates, int64 minor-unit amounts and
+        dictionary-encoded type/description/date_text/category. 'metadata' (e.g. the
+        statement's key fields) is stored as JSON in the schema metadata.
+        """
+        pa = _require_pyarrow()
+        table = pa.table({
+            "date": pa.array(self.date, type=pa.date32()),
+            "amount_minor": pa.array(self.amount_minor, type=pa.int64()),
+            "type": pa.DictionaryArray.from_arrays(
+                pa.array(self.type_codes, type=pa.int8(), mask=self.type_codes < 0),
+                pa.array(TYPES, type=pa.string())),
+            "description": pa.DictionaryArray.from_arrays(
+                pa.array(self.description_codes, type=pa.int32()), pa.array(self.descriptions, type=pa.string())),
+            "date_text": pa.DictionaryArray.from_arrays(
+                pa.array(self.date_text_codes, type=pa.int32()), pa.array(self.date_texts, type=pa.string())),
+            "category": pa.DictionaryArray.from_arrays(
+                pa.array(self.category_codes, type=pa.int32()), pa.array(self.categories, type=pa.string())),
+        })
+        if metadata:
+            table = table.replace_schema_metadata({"statement": json.dumps(metadata)})
+        return table
+
+    @classmethod
+    def from_arrow(cls, table):
+        """Inverse of to_arrow(); returns (TransactionTable, metadata dict)."""
+        pa = _require_pyarrow()
+        columns = {}
+        for name in ("description", "date_text", "category"):
+            if name not in table.column_names:  # files written before categorization
+                continue
+            column = table.column(name).combine_chunks()
+            if not pa.types.is_dictionary(column.type):
+                column = column.dictionary_encode()
+            columns[name] = (column.indices.to_numpy(zero_copy_only=False),
+                             column.dictionary.to_pylist())
+        # Unknown types are stored as nulls and come back as code -1
+        type_codes = pd.Categorical(table.column("type").to_pylist(), categories=TYPES).codes
+        metadata = (table.schema.metadata or {}).get(b"statement")
+        transactions = cls(
+            table.column("date").to_numpy(zero_copy_only=False).astype("datetime64[D]"),
+            table.column("amount_minor").to_numpy(),
+            type_codes,
+            *columns["description"],
+            *columns["date_text"],
+            *columns.get("category", (None, None)),
+        )
+        return transactions, json.loads(metadata) if metadata else {}
+
+    def write_parquet(self, path, metadata=None):
+        """Parquet file (zstd); 'path' may also be a binary file object."""
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(metadata), path, compression="zstd")
+
+    def write_ipc(self, path, metadata=None):
+        """Arrow IPC (Feather v2) file, readable with pyarrow.ipc or pandas.read_feather."""
+        pa = _require_pyarrow()
+        table = self.to_arrow(metadata)
+        with pa.OSFile(str(path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    @classmethod
+    def read_parquet(cls, path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        return cls.from_arrow(pq.read_table(path))
+
+    @classmethod
+    def read_ipc(cls, path):
+        pa = _require_pyarrow()
+        with pa.memory_map(str(path), "r") as source:
+            return cls.from_arrow(pa.ipc.open_file(source).read_all())
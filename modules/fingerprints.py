@@ -0,0 +1,257 @@
+"""
+Fingerprint index for duplicate statements and overlapping transactions.
+
+Every fingerprint is a 64-bit BLAKE2b digest of normalized content, so
+re-downloads and re-exports with different PDF metadata hash the same:
+
+  - header key:   card_last4, statement period and total_due (from
+                  extract_key_fields). Known header keys let a duplicate be
+                  skipped before extract_transactions runs.
+  - statement:    the header key plus a digest of all transaction keys; it
+                  catches duplicates whose header fields are incomplete.
+  - transaction:  card, date, signed amount and normalized description, plus an
+                  ordinal so that identical rows inside one statement (two
+                  coffees on the same day) all count. A key already in the
+                  index is an overlap with an earlier statement and is dropped.
+
+Digests are kept in DigestSets: a sorted uint64 array plus a small set of
+recent additions, about 8 bytes per entry, so millions of transactions fit
+in tens of MB. The index is saved as one .npz file.
+"""
+from hashlib import blake2b
+import os
+import sys
+
+from modules.store import amount_minor, iso_date, _normalize
+from modules.table_extractor import date_format
+
+DEFAULT_INDEX_PATH = os.path.join(".statement_cache", "fingerprints.npz")
+
+
+def digest(*parts):
+    """64-bit digest of the parts, as an int."""
+    return _digest_text("\x1f".join("" if p is None else str(p) for p in parts))
+
+
+def _digest_text(text):
+    return int.from_bytes(blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _header_fields(data):
+    """
+    (card, from, to, total_due minor) from extract_key_fields output or a
+    parsed statement. The two period dates share one format, chosen from
+    them alone, so both shapes give the same key.
+    """
+    period = data.get("statement_period")
+    if isinstance(period, dict):
+        start, end = period.get("from"), period.get("to")
+    else:
+        start, end = data.get("statement_period_from"), data.get("statement_period_to")
+    fmt = date_format([start, end])
+    return (data.get("card_last4"), iso_date(start, fmt), iso_date(end, fmt), amount_minor(data.get("total_due")))
+
+
+def header_key(data):
+    """Header digest of a statement, or None if any of its header fields is missing."""
+    fields = _header_fields(data)
+    if any(f is None for f in fields):
+        return None
+    return digest("header", *fields)
+
+
+def transaction_keys(transactions, card_last4=None):
+    """
+    One digest per transaction: card, date, signed amount (credits negative)
+    and normalized description, plus its ordinal among identical rows.
+    Dates are read with one format for the whole statement.
+    """
+    keys = []
+    seen = {}
+    card = card_last4 or ""
+    fmt = date_format([t.get("date") for t in transactions])
+    for t in transactions:
+        amount = amount_minor(t.get("amount"))
+        if amount is not None and t.get("type") == "credit":
+            amount = -amount
+        text = t.get("date")
+        base = f"{card}\x1f{iso_date(text, fmt) or text or ''}\x1f{amount}\x1f{_normalize(t.get('description') or '')}"
+        ordinal = seen.get(base, 0)
+        seen[base] = ordinal + 1
+        keys.append(_digest_text(f"{base}\x1f{ordinal}"))
+    return keys
+
+
+def statement_key(data, keys=None):
+    """Full statement digest: header fields plus the (order-independent) transaction keys."""
+    if keys is None:
+        keys = transaction_keys(data.get("transactions") or [], data.get("card_last4"))
+    return digest("statement", *_header_fields(data), *sorted(keys))
+
+
+class DigestSet:
+    """
+    Compact set of 64-bit digests: a sorted numpy uint64 array plus a Python
+    set of recent additions, merged into the array once it holds MERGE_AT
+    entries. Lookups are a set probe and a binary search.
+    """
+
+    MERGE_AT = 1 << 16
+
+    def __init__(self, values=None):
+        import numpy as np
+
+        self._np = np
+        self._sorted = np.unique(np.asarray(values if values is not None else [], dtype=np.uint64))
+        self._recent = set()
+
+    def __len__(self):
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, value):
+        if value in self._recent:
+            return True
+        i = int(self._sorted.searchsorted(self._np.uint64(value)))
+        return i < len(self._sorted) and int(self._sorted[i]) == value
+
+    def contains_many(self, values):
+        """Membership of each value, with one vectorized search of the array."""
+        np = self._np
+        found = [v in self._recent for v in values]
+        if len(self._sorted) and values:
+            query = np.fromiter(values, dtype=np.uint64, count=len(values))
+            idx = np.minimum(self._sorted.searchsorted(query), len(self._sorted) - 1)
+            hits = self._sorted[idx] == query
+            found = [f or bool(h) for f, h in zip(found, hits)]
+        return found
+
+    def add(self, value):
+        if value not in self:
+            self._recent.add(value)
+            if len(self._recent) >= self.MERGE_AT:
+                self._merge()
+
+    def add_many(self, values, present=None):
+        """Adds values; 'present' may pass their contains_many() result to skip the lookups."""
+        if present is None:
+            present = self.contains_many(values)
+        self._recent.update(v for v, p in zip(values, present) if not p)
+        if len(self._recent) >= self.MERGE_AT:
+            self._merge()
+
+    def array(self):
+        """All digests as a sorted uint64 array."""
+        self._merge()
+        return self._sorted
+
+    def nbytes(self):
+        return self._sorted.nbytes + sys.getsizeof(self._recent)
+
+    def _merge(self):
+        if self._recent:
+            np = self._np
+            recent = np.fromiter(self._recent, dtype=np.uint64, count=len(self._recent))
+            self._sorted = np.union1d(self._sorted, recent)
+            self._recent = set()
+
+
+class FingerprintIndex:
+    """
+    Header keys, statement keys and transaction keys of every statement
+    ingested so far, persisted in one .npz file.
+
+    is_duplicate(key_fields) is the cheap check made right after the key
+    fields are read; ingest(statement) records a parsed statement and
+    returns it without the transactions already seen in earlier ones.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        arrays = {}
+        if path and os.path.exists(path):
+            import numpy as np
+            try:
+                with np.load(path) as data:
+                    arrays = {name: data[name] for name in data.files}
+            except (OSError, ValueError) as e:
+                print(f"Fingerprint index: could not read {path} ({e}). Starting empty.")
+        self.headers = DigestSet(arrays.get("headers"))
+        self.statements = DigestSet(arrays.get("statements"))
+        self.transactions = DigestSet(arrays.get("transactions"))
+        self.dirty = False
+        self.duplicates = 0
+        self.overlaps = 0
+
+    def is_duplicate(self, key_fields):
+        """Whether a statement with these header fields was already ingested."""
+        key = header_key(key_fields)
+        return key is not None and key in self.headers
+
+    def ingest(self, statement):
+        """
+        Records one parsed statement. Returns (statement, overlaps): None
+        if it is a duplicate of one already ingested, else a copy without
+        the transactions seen before, and the number of those dropped.
+        """
+        head = header_key(statement)
+        if head is not None and head in self.headers:
+            self.duplicates += 1
+            return None, 0
+        transactions = statement.get("transactions") or []
+        keys = transaction_keys(transactions, statement.get("card_last4"))
+        full = statement_key(statement, keys)
+        if full in self.statements:
+            self.duplicates += 1
+            return None, 0
+
+        present = self.transactions.contains_many(keys)
+        kept = [t for t, p in zip(transactions, present) if not p]
+        self.transactions.add_many(keys, present)
+        if head is not None:
+            self.headers.add(head)
+        self.statements.add(full)
+        self.dirty = True
+        overlaps = len(transactions) - len(kept)
+        self.overlaps += overlaps
+        if overlaps:
+            statement = dict(statement, transactions=kept)
+        return statement, overlaps
+
+    def filter(self, statements):
+        """Ingests a stream of statements, yielding the non-duplicates without their overlaps."""
+        for statement in statements:
+            statement, _ = self.ingest(statement)
+            if statement is not None:
+                yield statement
+
+    def stats(self):
+        return {
+            "statements": len(self.statements),
+            "transactions": len(self.transactions),
+            "bytes": self.headers.nbytes() + self.statements.nbytes() + self.transactions.nbytes(),
+        }
+
+    def save(self):
+        """Writes the index atomically (temp file + rename)."""
+        if not self.path or not self.dirty:
+            return
+        import numpy as np
+
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, headers=self.headers.array(), statements=self.statements.array(),
+                     transactions=self.transactions.array())
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Statements are ingested before the caller stores them; if that
+        # failed, saving would mark data that was never stored as seen.
+        if exc[0] is None:
+            self.save()
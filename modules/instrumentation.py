@@ -0,0 +1,135 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class PipelineMetrics:
+    """
+    Collects per-stage metrics for one document: wall time, CPU time, pages
+    processed and rows produced.
+
+    Use stage() as a context manager around each pipeline step, or add() for
+    steps that are timed piecewise (e.g. streamed page reading). finish()
+    builds a JSON-serializable record and passes it to every hook.
+
+    With profile_threshold (seconds) set, cProfile and tracemalloc run for
+    the whole document; their output is kept in profile_dir only if the
+    document took longer than the threshold.
+    """
+
+    def __init__(self, document, hooks=None, profile_threshold=None, profile_dir="profiles"):
+        self.document = str(document)
+        self.hooks = list(hooks or [])
+        self.stages = {}
+        self.extra = {}
+        self.record = None  # set by finish()
+        self.profile_threshold = profile_threshold
+        self.profile_dir = profile_dir
+        self._profiler = None
+        self._started_tracemalloc = False
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+        if profile_threshold is not None:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def add(self, name, wall_time=0.0, cpu_time=0.0, pages=None, rows=None):
+        """Accumulates time (and optionally pages/rows) into a stage."""
+        stage = self.stages.setdefault(name, {"wall_time": 0.0, "cpu_time": 0.0, "pages": None, "rows": None})
+        stage["wall_time"] += wall_time
+        stage["cpu_time"] += cpu_time
+        if pages is not None:
+            stage["pages"] = (stage["pages"] or 0) + pages
+        if rows is not None:
+            stage["rows"] = (stage["rows"] or 0) + rows
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the enclosed block. The yielded dict may be given 'pages' and
+        'rows' counts, e.g. `with metrics.stage("x") as s: s["rows"] = n`.
+        """
+        counts = {}
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield counts
+        finally:
+            self.add(name, time.perf_counter() - wall, time.process_time() - cpu,
+                     pages=counts.get("pages"), rows=counts.get("rows"))
+
+    def finish(self, status="ok", **extra):
+        """Stops timing, saves a profile if slow, and emits the record to hooks."""
+        self.extra.update(extra)
+        record = {
+            "document": self.document,
+            "status": status,
+            "wall_time": time.perf_counter() - self._start_wall,
+            "cpu_time": time.process_time() - self._start_cpu,
+            "stages": self.stages,
+        }
+        record.update(self.extra)
+
+        if self._profiler is not None:
+            self._profiler.disable()
+            snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+            if record["wall_time"] >= self.profile_threshold:
+                record["profile"] = self._save_profile(snapshot)
+            self._profiler = None
+
+        self.record = record
+        for hook in self.hooks:
+            hook(record)
+        return record
+
+    def _save_profile(self, snapshot):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stem = re.sub(r'[^A-Za-z0-9_.-]', '_', os.path.basename(self.document)) or "document"
+        stem = f"{stem}.{int(time.time())}.{os.getpid()}"
+
+        prof_path = os.path.join(self.profile_dir, f"{stem}.prof")
+        self._profiler.dump_stats(prof_path)
+
+        # Human-readable top functions next to the binary profile
+        text = io.StringIO()
+        pstats.Stats(self._profiler, stream=text).sort_stats("cumulative").print_stats(30)
+        with open(os.path.join(self.profile_dir, f"{stem}.txt"), 'w', encoding='utf-8') as f:
+            f.write(text.getvalue())
+
+        saved = {"cprofile": prof_path}
+        if snapshot is not None:
+            mem_path = os.path.join(self.profile_dir, f"{stem}.tracemalloc.txt")
+            with open(mem_path, 'w', encoding='utf-8') as f:
+                for stat in snapshot.statistics("lineno")[:30]:
+                    f.write(f"{stat}\n")
+            saved["tracemalloc"] = mem_path
+        return saved
+
+
+def jsonl_hook(path):
+    """Hook that appends each metrics record as one JSON line to 'path'."""
+    lock = threading.Lock()
+
+    def write(record):
+        line = json.dumps(record, separators=(",", ":"))
+        with lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+    return write
+
+
+def print_hook(record):
+    """Hook that prints the metrics record as indented JSON."""
+    print(json.dumps(record, indent=4))
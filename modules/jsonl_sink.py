@@ -0,0 +1,167 @@
+import gzip
+import json
+import multiprocessing
+import os
+import queue
+
+COMPRESSIONS = (None, "gzip", "zstd")
+
+# How long SinkProcess waits on a full queue (or for the writer to finish)
+# before checking that the writer process is still alive (seconds).
+POLL_INTERVAL = 1.0
+
+
+def _infer_compression(path):
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def _resolve_compression(path, compression):
+    """Validates the compression (inferring it from the path for 'auto') and checks it is installed."""
+    if compression == "auto":
+        compression = _infer_compression(path)
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}'. Choose one of {COMPRESSIONS}.")
+    if compression == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError as e:
+            raise ImportError("zstd compression needs zstandard: pip install zstandard") from e
+    return compression
+
+
+class JsonlSink:
+    """
+    Append-only JSON Lines (NDJSON) writer for parsed statements.
+
+    Each write() appends one compact line per statement, or with
+    per_transaction=True one line per transaction (carrying the statement's
+    key fields), as soon as the result is available; nothing is held back.
+    Output is buffered and optionally gzip/zstd compressed (inferred from a
+    .gz/.zst extension by default). Appending to an existing compressed
+    file adds a new gzip member / zstd frame, which readers handle.
+
+    A JsonlSink must only be written from one process; see SinkProcess for
+    feeding it from several workers.
+    """
+
+    def __init__(self, path, per_transaction=False, compression="auto", buffer_size=1 << 20):
+        compression = _resolve_compression(path, compression)
+        self.path = path
+        self.per_transaction = per_transaction
+        self.lines = 0
+
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._raw = open(path, 'ab', buffering=buffer_size)
+        if compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode='ab')
+        elif compression == "zstd":
+            import zstandard
+            self._stream = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+        else:
+            self._stream = self._raw
+
+    def write(self, data, source=None):
+        """Appends one parsed statement (or its transactions)."""
+        if self.per_transaction:
+            header = {k: v for k, v in data.items() if k != "transactions"}
+            if source is not None:
+                header["source"] = source
+            for tx in data.get("transactions", []):
+                self._write_line(dict(header, **tx))
+        else:
+            record = data if source is None else dict(data, source=source)
+            self._write_line(record)
+
+    def _write_line(self, record):
+        self._stream.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+        self.lines += 1
+
+    def flush(self):
+        self._stream.flush()
+        if self._stream is not self._raw:
+            self._raw.flush()
+
+    def close(self):
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _sink_writer(queue, path, per_transaction, compression, buffer_size):
+    """Writer process: drains the queue into a JsonlSink until None arrives."""
+    with JsonlSink(path, per_transaction, compression, buffer_size) as sink:
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            data, source = item
+            sink.write(data, source)
+
+
+class SinkProcess:
+    """
+    Runs a JsonlSink in its own process, so serializing, compressing and
+    writing overlap with parsing. Processes call put() (or put on .queue
+    directly); the bounded queue applies backpressure if the writer falls
+    behind, so results never pile up in memory. Don't feed it from
+    processes that may be killed (e.g. SupervisedPool workers): one killed
+    in the middle of a put can leave the queue locked.
+
+    If the writer dies (e.g. the output disk is full), put() and close()
+    raise RuntimeError instead of blocking on a queue nobody drains.
+    """
+
+    def __init__(self, path, per_transaction=False, compression="auto",
+                 buffer_size=1 << 20, max_pending=256, close_timeout=60.0):
+        # Fail here, not in the writer, when the compression isn't available
+        compression = _resolve_compression(path, compression)
+        self.close_timeout = close_timeout
+        self.queue = multiprocessing.Queue(maxsize=max_pending)
+        self._process = multiprocessing.Process(
+            target=_sink_writer,
+            args=(self.queue, path, per_transaction, compression, buffer_size),
+            daemon=True)
+        self._process.start()
+
+    def put(self, data, source=None):
+        self._put((data, source))
+
+    def close(self):
+        if self._process.exitcode is None:
+            self._put(None)
+            self._process.join(self.close_timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+                raise RuntimeError(f"JSONL writer did not finish within {self.close_timeout:g}s")
+        if self._process.exitcode != 0:
+            raise RuntimeError(f"JSONL writer process failed (exit code {self._process.exitcode})")
+
+    def _put(self, item):
+        # The writer only exits once it gets None, so any earlier exit is a crash
+        while True:
+            if not self._process.is_alive():
+                raise RuntimeError(f"JSONL writer process died (exit code {self._process.exitcode})")
+            try:
+                self.queue.put(item, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
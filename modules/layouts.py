@@ -0,0 +1,90 @@
+import json
+import os
+import threading
+import time
+
+from modules.cache import DEFAULT_CACHE_DIR
+
+# Layout learning is off unless this names the templates file (e.g.
+# DEFAULT_LAYOUTS_PATH), so plain runs never write to the working directory.
+LAYOUTS_ENV = "STATEMENT_LAYOUT_CACHE"
+DEFAULT_LAYOUTS_PATH = os.path.join(DEFAULT_CACHE_DIR, "layouts.json")
+
+
+class LayoutCache:
+    """
+    Learned table layouts, keyed by a layout fingerprint (issuer, page size
+    and the transaction header's cells and positions; see
+    table_extractor.layout_fingerprint).
+
+    A template holds what Camelot would otherwise detect on every document:
+    the table areas on the first and continuation pages, the column
+    x-positions, and the header cells with their column roles. Templates are
+    kept in one JSON file; writes re-read it and replace it atomically, so
+    several processes can share the file.
+    """
+
+    def __init__(self, path=DEFAULT_LAYOUTS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._templates = self._read()
+        self.stats = {"hits": 0, "misses": 0, "learned": 0, "rejected": 0}
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, fingerprint):
+        with self._lock:
+            template = self._templates.get(fingerprint)
+            self.stats["hits" if template else "misses"] += 1
+            return template
+
+    def put(self, fingerprint, template):
+        """Stores (or replaces) the template learned for fingerprint."""
+        template = dict(template, learned_at=time.time())
+        with self._lock:
+            self._templates = self._read()
+            self._templates[fingerprint] = template
+            self.stats["learned"] += 1
+            self._write()
+
+    def reject(self, fingerprint):
+        """Drops a template that produced implausible rows."""
+        with self._lock:
+            self._templates = self._read()
+            self._templates.pop(fingerprint, None)
+            self.stats["rejected"] += 1
+            self._write()
+
+    def _write(self):
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._templates, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Layouts: could not write {self.path}: {e}")
+
+    def __len__(self):
+        return len(self._templates)
+
+
+_default_layouts = None
+
+
+def default_layout_cache():
+    """The process-wide LayoutCache (path from LAYOUTS_ENV), or None if that isn't set."""
+    global _default_layouts
+    path = os.environ.get(LAYOUTS_ENV)
+    if not path:
+        return None
+    if _default_layouts is None or _default_layouts.path != path:
+        _default_layouts = LayoutCache(path)
+    return _default_layouts
@@ -0,0 +1,158 @@
+import glob
+import os
+import sqlite3
+import time
+
+from modules.cache import hash_file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT,
+    parser_version TEXT NOT NULL,
+    status TEXT NOT NULL,
+    output TEXT,
+    error TEXT,
+    processed_at REAL NOT NULL
+)
+"""
+
+
+def scan_statements(source):
+    """
+    Like batch.find_statements, but returns {absolute path: (size, mtime_ns)}.
+
+    Directories are walked with os.scandir so each file costs one stat and
+    no hashing; this is what keeps re-scans of large archives fast.
+    """
+    found = {}
+    if os.path.isdir(source):
+        stack = [source]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(".pdf") and entry.is_file():
+                        st = entry.stat()
+                        found[os.path.abspath(entry.path)] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue
+    else:
+        for path in glob.glob(source, recursive=True):
+            if path.lower().endswith(".pdf"):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if os.path.isfile(path):
+                    found[os.path.abspath(path)] = (st.st_size, st.st_mtime_ns)
+    return found
+
+
+class Manifest:
+    """
+    SQLite record of processed statements: path, size, mtime, content hash,
+    parser version and outcome. It lives on disk, so it survives restarts.
+
+    A file is pending when it is new, when its size/mtime changed and its
+    content hash did too, when the parser version changed, or (with
+    retry_failed) when its last run failed. Unchanged files cost one stat
+    and a dict lookup; files are only hashed when their stat changed.
+    """
+
+    def __init__(self, path, parser_version):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self.parser_version = parser_version
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        self.uncommitted = 0
+
+    def entries(self):
+        """{path: (size, mtime_ns, sha256, parser_version, status, output)} for every known file."""
+        rows = self._conn.execute(
+            "SELECT path, size, mtime_ns, sha256, parser_version, status, output FROM files")
+        return {row[0]: row[1:] for row in rows}
+
+    def outputs(self):
+        """Output paths already handed out, so new files don't reuse them."""
+        return {row[0] for row in self._conn.execute("SELECT output FROM files WHERE output IS NOT NULL")}
+
+    def pending(self, scanned, retry_failed=False, settle=0.0):
+        """
+        Splits scanned ({path: (size, mtime_ns)}) into files to process.
+
+        Files modified less than 'settle' seconds ago are left for the next
+        pass, since they may still be being copied into the folder. A file
+        whose stat changed but whose content hash did not (a touch, or a
+        copy that preserved the bytes) has its stat refreshed and is skipped.
+        Returns (pending paths sorted, number unchanged).
+        """
+        known = self.entries()
+        cutoff = time.time_ns() - int(settle * 1e9)
+        pending = []
+        unchanged = 0
+        refreshed = []
+        for path, (size, mtime_ns) in scanned.items():
+            if settle and mtime_ns > cutoff:
+                continue
+            entry = known.get(path)
+            if entry is None or entry[3] != self.parser_version:
+                pending.append(path)
+                continue
+            old_size, old_mtime, sha256, _, status, _ = entry
+            if status != "ok" and retry_failed:
+                pending.append(path)
+            elif (old_size, old_mtime) == (size, mtime_ns):
+                unchanged += 1
+            elif size == old_size and sha256 and _safe_hash(path) == sha256:
+                refreshed.append((size, mtime_ns, path))
+                unchanged += 1
+            else:
+                pending.append(path)
+        if refreshed:
+            with self._conn:
+                self._conn.executemany("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", refreshed)
+        return sorted(pending), unchanged
+
+    def record(self, path, size, mtime_ns, sha256, status, output=None, error=None):
+        """Stores one file's outcome. Call commit() to persist a group of records."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files "
+            "(path, size, mtime_ns, sha256, parser_version, status, output, error, processed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, sha256, self.parser_version, status, output, error, time.time()))
+        self.uncommitted += 1
+
+    def commit(self):
+        self._conn.commit()
+        self.uncommitted = 0
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _safe_hash(path):
+    try:
+        return hash_file(path)
+    except OSError:
+        return None
@@ -1,24 +1,124 @@
 # ...existing code...
-import fitz  # PyMuPDF
+"""
+Opening statement PDFs from paths, bytes, buffers, mmaps or open documents.
+
+PyMuPDF is imported by open_document() on first use, so cache hits and
+--help never load it.
+"""
+import mmap
 import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+def _is_document(source):
+    """isinstance(source, fitz.Document), without importing PyMuPDF."""
+    for name in ("pymupdf", "fitz"):
+        module = sys.modules.get(name)
+        if module is not None and isinstance(source, module.Document):
+            return True
+    return False
+
+def as_pdf_input(source):
+    """
+    Normalizes a PDF source so it can be read more than once: file objects
+    (BytesIO, uploads) become an in-memory buffer, an mmap becomes a
+    zero-copy memoryview. Paths, bytes and open Documents pass through.
+    """
+    if isinstance(source, mmap.mmap):
+        return memoryview(source)
+    if hasattr(source, "getbuffer"):  # BytesIO: no copy
+        return source.getbuffer()
+    if hasattr(source, "read") and not _is_document(source):
+        return source.read()
+    return source
+
+def open_document(source):
+    """
+    Opens a PDF from a path, bytes/bytearray/memoryview, a file object
+    (e.g. BytesIO) or an mmap. In-memory sources are opened with
+    fitz.open(stream=...), so nothing is written to disk.
+    """
+    if _is_document(source):
+        return source
+    import fitz  # PyMuPDF
+    if isinstance(source, (str, os.PathLike)):
+        return fitz.open(source)
+    return fitz.open(stream=as_pdf_input(source), filetype="pdf")
+
+@contextmanager
+def document(source):
+    """
+    Context manager around open_document(). A Document passed in by the
+    caller is shared, not closed; anything opened here is closed on exit.
+    """
+    doc = open_document(source)
+    try:
+        yield doc
+    finally:
+        if doc is not source:
+            doc.close()
+
+@contextmanager
+def spill_to_disk(source):
+    """
+    Yields a filesystem path for engines that cannot read from memory
+    (Camelot). Paths, and Documents opened from a file, are used as they
+    are; only in-memory PDFs are written to a temporary file, which is
+    removed afterwards.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+    if _is_document(source):
+        if source.name and os.path.exists(source.name):
+            yield source.name
+            return
+        data = source.tobytes()
+    else:
+        data = as_pdf_input(source)
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+        tmp.write(data)
+        tmp_path = tmp.name
+    try:
+        yield tmp_path
+    finally:
+        os.remove(tmp_path)
+
+def iter_pages(source):
+    """
+    Yields the text of each page lazily, one page at a time.
+    Stopping early (or closing the generator) closes the document, so
+    consumers that only need page 1 never touch the rest of the file.
+    'source' is anything open_document() accepts; a Document passed in is
+    left open for the caller.
+    """
+    if isinstance(source, (str, os.PathLike)) and not os.path.exists(source):
+        print(f"Error: File not found at {source}")
+        return
+
+    try:
+        doc = open_document(source)
+    except Exception as e:
+        print(f"An error occurred while reading the PDF: {e}")
+        return
 
-def read_pdf(file_path):
-   
-    if not os.path.exists(file_path):
-        print(f"Error: File not found at {file_path}")
-        return ""
-        
     try:
-        doc = fitz.open(file_path)
-        full_text = ""
         for page in doc:
-            full_text += page.get_text()
-        doc.close()
-        
-        if not full_text.strip():
-            print("Warning: PDF found, but no text could be extracted. It might be an image-based PDF.")
-            
-        return full_text
+            yield page.get_text()
     except Exception as e:
         print(f"An error occurred while reading the PDF: {e}")
-        return ""
+    finally:
+        if doc is not source:
+            doc.close()
+
+def read_pdf(file_path):
+   
+    full_text = "".join(iter_pages(file_path))
+        
+    missing = isinstance(file_path, (str, os.PathLike)) and not os.path.exists(file_path)
+    if not missing and not full_text.strip():
+        print("Warning: PDF found, but no text could be extracted. It might be an image-based PDF.")
+            
+    return full_text
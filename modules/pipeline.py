@@ -0,0 +1,199 @@
+import os
+import time
+from contextlib import contextmanager
+
+from modules.categorizer import default_categorizer
+from modules.pdf_reader import as_pdf_input, iter_pages, open_document
+from modules.text_parser import clean_text, extract_key_fields
+from modules.table_extractor import extract_transactions
+from modules.cache import hash_bytes, hash_file, make_key
+
+# Bump whenever parsing output changes, so cached results from older
+# versions are no longer served.
+PARSER_VERSION = "6"
+
+
+def structure_data(key_fields, transactions):
+    """
+    Step 5: Combine key fields and transactions into the final JSON structure.
+    """
+    return {
+        "card_last4": key_fields.get("card_last4"),
+        "statement_period": {
+            "from": key_fields.get("statement_period_from"),
+            "to": key_fields.get("statement_period_to")
+        },
+        "payment_due_date": key_fields.get("payment_due_date"),
+        "total_due": key_fields.get("total_due"),
+        "minimum_due": key_fields.get("minimum_due"),
+        "transactions": transactions
+    }
+
+
+def cache_key(source, engine="auto"):
+    """
+    Content-addressed cache key for a statement parsed with 'engine' and
+    the active categorization rules (default_categorizer(), which includes
+    --categories / RULES_ENV). 'source' is a path or the PDF's bytes (any
+    buffer, e.g. a memoryview).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        content_hash = hash_file(source)
+    else:
+        content_hash = hash_bytes(source)
+    return make_key(content_hash, f"v{PARSER_VERSION}-{engine}-r{default_categorizer().digest}")
+
+
+def parse_statement(source, engine="auto", cache=None, metrics=None, tables=True, index=None):
+    """
+    Runs the complete parsing pipeline (read -> clean -> key fields ->
+    transactions) on one PDF and returns the structured data.
+    Returns None if no text could be read from the PDF.
+
+    'source' is a path, PDF bytes, a BytesIO/file object or an mmap. The
+    document is opened once and shared by every stage; in-memory PDFs are
+    only written to disk if the Camelot engine runs.
+
+    If a ResultCache is given it is checked before any PDF work is done,
+    and successful results are stored in it. If a PipelineMetrics is given,
+    every stage is timed and metrics.finish() is called at the end.
+
+    With tables=False the transaction table is skipped (degraded mode, used
+    to salvage the key fields of statements whose tables hang or crash the
+    table engines). The result has no transactions and "degraded": True, and
+    is never cached.
+
+    With a fingerprints.FingerprintIndex, a statement whose header fields
+    (card, period, total due) are already indexed is not parsed further:
+    the result has only the key fields and "duplicate": True. The index is
+    only read here; callers record statements with index.ingest().
+    """
+    if not tables:
+        cache = None
+    key = None
+    # Everything that can raise sits in the try, so metrics.finish() always
+    # runs and a profiler started by the metrics is always stopped.
+    try:
+        source = as_pdf_input(source)
+        if cache is not None:
+            with _stage(metrics, "cache_lookup"):
+                key = cache_key(source, engine)
+                cached = cache.get(key)
+            if cached is not None:
+                if metrics is not None:
+                    metrics.finish(cache="hit", transactions=len(cached["transactions"]))
+                return cached
+
+        structured_data = _run_pipeline(source, engine, metrics, tables, index)
+    except Exception:
+        if metrics is not None:
+            metrics.finish(status="error")
+        raise
+
+    if cache is not None and structured_data is not None and not structured_data.get("duplicate"):
+        cache.put(key, structured_data)
+    if metrics is not None:
+        status = "no_text" if structured_data is None else "duplicate" if structured_data.get("duplicate") else "ok"
+        metrics.finish(status=status,
+                       cache="miss" if cache is not None else None,
+                       transactions=len(structured_data["transactions"]) if structured_data else 0)
+    return structured_data
+
+
+@contextmanager
+def _stage(metrics, name):
+    """metrics.stage(name), or a no-op when metrics are not being collected."""
+    if metrics is None:
+        yield {}
+    else:
+        with metrics.stage(name) as counts:
+            yield counts
+
+
+def read_key_fields(source, metrics=None):
+    """
+    Steps 1-3 streamed: pages are read, cleaned and scanned one at a time,
+    and reading stops once every header field is found. Returns None if the
+    PDF has no extractable text.
+
+    Because the three steps interleave page by page, their metrics are
+    accumulated piecewise: 'read_pdf' and 'clean_text' time each page, and
+    'extract_key_fields' gets the remainder.
+    """
+    has_text = False
+    totals = {"read": [0.0, 0.0], "clean": [0.0, 0.0], "pages": 0}
+
+    def timed(bucket, func, *args):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            return func(*args)
+        finally:
+            totals[bucket][0] += time.perf_counter() - wall
+            totals[bucket][1] += time.process_time() - cpu
+
+    def cleaned_pages():
+        nonlocal has_text
+        pages = iter_pages(source)
+        try:
+            while True:
+                page_text = timed("read", next, pages, None)
+                if page_text is None:
+                    return
+                totals["pages"] += 1
+                if not has_text and page_text.strip():
+                    has_text = True
+                yield timed("clean", clean_text, page_text)
+        finally:
+            pages.close()
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    key_fields = extract_key_fields(cleaned_pages())
+    if metrics is not None:
+        read, clean = totals["read"], totals["clean"]
+        metrics.add("read_pdf", read[0], read[1], pages=totals["pages"])
+        metrics.add("clean_text", clean[0], clean[1], pages=totals["pages"])
+        metrics.add("extract_key_fields",
+                    time.perf_counter() - wall - read[0] - clean[0],
+                    time.process_time() - cpu - read[1] - clean[1],
+                    rows=sum(1 for k, v in key_fields.items() if v is not None and k != "issuer"))
+        metrics.extra["issuer"] = key_fields.get("issuer")
+    if not has_text:
+        if not isinstance(source, (str, os.PathLike)) or os.path.exists(source):
+            print("Warning: PDF found, but no text could be extracted. It might be an image-based PDF.")
+        return None
+    return key_fields
+
+
+def _run_pipeline(source, engine, metrics=None, tables=True, index=None):
+    if isinstance(source, (str, os.PathLike)) and not os.path.exists(source):
+        print(f"Error: File not found at {source}")
+        return None
+    try:
+        doc = open_document(source)
+    except Exception as e:
+        print(f"An error occurred while reading the PDF: {e}")
+        return None
+
+    # One open document is shared by the text reader and the table engines
+    try:
+        key_fields = read_key_fields(doc, metrics)
+        if key_fields is None:
+            return None
+        if index is not None and index.is_duplicate(key_fields):
+            # Skip the expensive table step for statements already ingested
+            return dict(structure_data(key_fields, []), duplicate=True)
+
+        transactions = []
+        if tables:
+            with _stage(metrics, "extract_transactions") as counts:
+                transactions = extract_transactions(doc, engine=engine)
+                counts["rows"] = len(transactions)
+    finally:
+        if doc is not source:
+            doc.close()
+
+    with _stage(metrics, "structure_data"):
+        data = structure_data(key_fields, transactions)
+    if not tables:
+        data["degraded"] = True
+    return data
@@ -1,109 +1,275 @@
+"""
+Summary PDF reports and JSON/Parquet/Arrow output of parsed statements.
+
+The ReportLab canvas/font machinery and PyMuPDF (which joins chunked
+reports) are imported by the functions that render, so save_json_output()
+callers don't pay for them.
+"""
+import itertools
 import json
-from reportlab.pdfgen import canvas
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from io import BytesIO
 
-def generate_summary_pdf(data):
-    """
-    Generates a summary PDF in memory and returns its raw bytes.
-    This version includes a try...except block to catch and re-raise
-    any errors that occur during PDF creation.
-    """
+# Streaming mode renders at most this many pages per ReportLab canvas.
+# ReportLab keeps every page of a canvas in memory until save(), so large
+# reports are rendered in chunks and joined, keeping memory flat.
+CHUNK_PAGES = 100
+
+# Transaction rows that fit on one page (0.15 inch per row)
+_ROWS_PER_PAGE = 60
+
+# Column layout: x positions and maximum text widths (points)
+_DESCRIPTION_WIDTH = 4.3 * inch
+_DATE_WIDTH = 0.95 * inch
+
+
+def _fit(text, font, size, max_width):
+    """Truncates text with '...' so it fits in max_width points."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    full_width = stringWidth(text, font, size)
+    if full_width <= max_width:
+        return text
+    ellipsis = "..."
+    # Jump close to the right length first, then trim the last few characters
+    text = text[:int(len(text) * max_width / full_width)]
+    while text and stringWidth(text + ellipsis, font, size) > max_width:
+        text = text[:-1]
+    return text + ellipsis
+
+
+def _draw_summary(c, data, width, height):
+    """Draws the title and key fields. Returns the y position below them."""
+    # --- Title ---
+    c.setFont("Helvetica-Bold", 16)
+    c.drawCentredString(width / 2.0, height - 1.0 * inch, "Credit Card Statement Summary")
     
-    buffer = BytesIO() # Create an in-memory buffer
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter  # (612, 792)
+    # --- Key Fields ---
+    c.setFont("Helvetica-Bold", 12)
+    y = height - 1.5 * inch
+    c.drawString(1 * inch, y, "Key Information")
     
-    # --- *** ADDED FULL TRY...EXCEPT BLOCK *** ---
-    # This will catch errors (like a missing key in 'data')
-    # and pass the exception up to app.py to be displayed.
-    try:
-        # --- Title ---
-        c.setFont("Helvetica-Bold", 16)
-        c.drawCentredString(width / 2.0, height - 1.0 * inch, "Credit Card Statement Summary")
-        
-        # --- Key Fields ---
-        c.setFont("Helvetica-Bold", 12)
-        y = height - 1.5 * inch
-        c.drawString(1 * inch, y, "Key Information")
-        
-        c.setFont("Helvetica", 10)
-        y -= 0.25 * inch
-        
-        # More robust data fetching with .get() to prevent KeyErrors
-        period = data.get('statement_period', {})
-        period_from = period.get('from', 'N/A')
-        period_to = period.get('to', 'N/A')
-
-        fields_to_draw = [
-            ("Card (Last 4):", data.get("card_last4", "N/A")),
-            ("Statement Period:", f"{period_from} to {period_to}"),
-            ("Payment Due Date:", data.get("payment_due_date", "N/A")),
-            ("Total Due:", data.get("total_due", "N/A")),
-            ("Minimum Due:", data.get("minimum_due", "N/A")),
-        ]
-        
-        for label, value in fields_to_draw:
-            c.drawString(1.2 * inch, y, f"{label} {value}")
-            y -= 0.25 * inch
-        
-        # --- Transactions Header ---
-        c.setFont("Helvetica-Bold", 12)
-        y -= 0.5 * inch
-        c.drawString(1 * inch, y, "Transactions")
-        
-        c.setFont("Helvetica-Bold", 9)
+    c.setFont("Helvetica", 10)
+    y -= 0.25 * inch
+    
+    # More robust data fetching with .get() to prevent KeyErrors
+    period = data.get('statement_period', {})
+    period_from = period.get('from', 'N/A')
+    period_to = period.get('to', 'N/A')
+
+    fields_to_draw = [
+        ("Card (Last 4):", data.get("card_last4", "N/A")),
+        ("Statement Period:", f"{period_from} to {period_to}"),
+        ("Payment Due Date:", data.get("payment_due_date", "N/A")),
+        ("Total Due:", data.get("total_due", "N/A")),
+        ("Minimum Due:", data.get("minimum_due", "N/A")),
+    ]
+    
+    for label, value in fields_to_draw:
+        c.drawString(1.2 * inch, y, f"{label} {value}")
         y -= 0.25 * inch
-        c.drawString(1.0 * inch, y, "Date")
-        c.drawString(2.0 * inch, y, "Description")
-        c.drawRightString(width - 1.0 * inch, y, "Amount") # Use drawRightString for alignment
-        y -= 0.1 * inch
-        c.line(1 * inch, y, width - 1 * inch, y)
-
-        # --- Transactions List ---
-        c.setFont("Helvetica", 8)
+    
+    # --- Transactions Header ---
+    c.setFont("Helvetica-Bold", 12)
+    y -= 0.5 * inch
+    c.drawString(1 * inch, y, "Transactions")
+    return y - 0.25 * inch
+
+
+def _draw_table_header(c, y, width):
+    c.setFont("Helvetica-Bold", 9)
+    c.drawString(1.0 * inch, y, "Date")
+    c.drawString(2.0 * inch, y, "Description")
+    c.drawRightString(width - 1.0 * inch, y, "Amount") # Use drawRightString for alignment
+    y -= 0.1 * inch
+    c.line(1 * inch, y, width - 1 * inch, y)
+    c.setFont("Helvetica", 8)
+    return y - 0.15 * inch
+
+
+def _render(c, data, transactions, width, height, first_page, max_pages=None):
+    """
+    Draws the report onto canvas c, consuming the 'transactions' iterator.
+    Stops after max_pages pages (if given) and returns True when every
+    transaction has been drawn.
+    """
+    pages = 1
+    if first_page:
+        y = _draw_table_header(c, _draw_summary(c, data, width, height), width)
+    else:
+        y = _draw_table_header(c, height - 1.0 * inch, width)
+
+    drawn_any = False
+    for tx in transactions:
+        drawn_any = True
+        if y < 1 * inch: # Stop from writing off the page
+            c.showPage() # Create new page
+            if max_pages is not None and pages >= max_pages:
+                # Chunk is full: hand the row to the next chunk
+                return False, tx
+            pages += 1
+            # Redraw headers on new page
+            y = _draw_table_header(c, height - 1.0 * inch, width)
+
+        # Use .get() and str() conversion for safety
+        c.drawString(1.0 * inch, y, _fit(str(tx.get('date', '')), "Helvetica", 8, _DATE_WIDTH))
+        c.drawString(2.0 * inch, y, _fit(str(tx.get('description', '')), "Helvetica", 8, _DESCRIPTION_WIDTH))
+        c.drawRightString(width - 1.0 * inch, y, str(tx.get('amount', '')))
         y -= 0.15 * inch
-        
-        transactions = data.get("transactions", [])
-        if not transactions: # Handle case with no transactions
-            c.setFont("Helvetica-Oblique", 8)
-            c.drawCentredString(width / 2.0, y - 0.25 * inch, "No transactions found.")
-
-        for tx in transactions:
-            if y < 1 * inch: # Stop from writing off the page
-                c.showPage() # Create new page
-                # Redraw headers on new page
-                c.setFont("Helvetica-Bold", 9)
-                y = height - 1.0 * inch
-                c.drawString(1.0 * inch, y, "Date")
-                c.drawString(2.0 * inch, y, "Description")
-                c.drawRightString(width - 1.0 * inch, y, "Amount")
-                y -= 0.1 * inch
-                c.line(1 * inch, y, width - 1 * inch, y)
-                c.setFont("Helvetica", 8)
-                y -= 0.15 * inch
-
-            # Use .get() and str() conversion for safety
-            c.drawString(1.0 * inch, y, str(tx.get('date', '')))
-            c.drawString(2.0 * inch, y, str(tx.get('description', '')))
-            c.drawRightString(width - 1.0 * inch, y, str(tx.get('amount', '')))
-            y -= 0.15 * inch
-
-        # --- Finalize PDF ---
-        c.showPage()
-        c.save() # Saves the PDF to the buffer
-        
-        # Get the bytes from the buffer and return them
-        pdf_bytes = buffer.getvalue()
-        buffer.close()
-        return pdf_bytes
 
-    except Exception as e:
-        # If any error occurs above, close the buffer and
-        # re-raise the exception so app.py can display it.
-        buffer.close()
-        raise e # This will pass the error to the `except Exception as pdf_error:` block in app.py
+    if first_page and not drawn_any: # Handle case with no transactions
+        c.setFont("Helvetica-Oblique", 8)
+        c.drawCentredString(width / 2.0, y - 0.25 * inch, "No transactions found.")
+
+    # --- Finalize PDF ---
+    c.showPage()
+    return True, None
+
+
+def generate_summary_pdf(data, output=None, chunk_pages=CHUNK_PAGES):
+    """
+    Generates a summary PDF.
+
+    - output=None: renders in memory and returns the raw bytes.
+    - output=path or writable binary file object: streams the report there
+      and returns None. Large reports are rendered chunk_pages pages at a
+      time and joined, so memory stays flat even for 100k transactions.
+
+    'transactions' in data may be any iterable of dicts (e.g. a generator).
+    Long dates and descriptions are truncated to their column width.
+    Errors (like a missing key in 'data') are re-raised to the caller.
+    """
+    from reportlab.pdfgen import canvas
+
+    transactions = data.get("transactions", [])
+    if output is None:
+        buffer = BytesIO() # Create an in-memory buffer
+        try:
+            c = canvas.Canvas(buffer, pagesize=letter)
+            width, height = letter  # (612, 792)
+            _render(c, data, iter(transactions), width, height, first_page=True)
+            c.save() # Saves the PDF to the buffer
+            # Get the bytes from the buffer and return them
+            return buffer.getvalue()
+        finally:
+            buffer.close()
+
+    # Small reports fit in one canvas: write straight to the output
+    if hasattr(transactions, "__len__") and len(transactions) <= chunk_pages * _ROWS_PER_PAGE // 2:
+        c = canvas.Canvas(output, pagesize=letter)
+        width, height = letter
+        _render(c, data, iter(transactions), width, height, first_page=True)
+        c.save()
+        return None
+
+    _render_chunked(data, iter(transactions), output, chunk_pages)
+    return None
+
+
+def _render_chunked(data, transactions, output, chunk_pages):
+    """Renders chunk_pages-page parts to a temp dir and joins them into output."""
+    from reportlab.pdfgen import canvas
+
+    width, height = letter
+    tmp_dir = tempfile.mkdtemp(prefix="summary_report_")
+    try:
+        parts = []
+        done, carry = False, None
+        while not done:
+            part_path = os.path.join(tmp_dir, f"part_{len(parts):05d}.pdf")
+            c = canvas.Canvas(part_path, pagesize=letter)
+            rows = transactions if carry is None else itertools.chain([carry], transactions)
+            done, carry = _render(c, data, rows, width, height,
+                                  first_page=not parts, max_pages=chunk_pages)
+            c.save()
+            parts.append(part_path)
+        _join_pdfs(parts, output)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _join_pdfs(paths, output):
+    """
+    Concatenates PDF files into output (a path or binary file object).
+
+    Every part is copied into one target document, which is saved once
+    (with unused objects dropped), and each part file is deleted as soon as
+    it has been copied. Linear in the number of parts.
+    """
+    if len(paths) == 1 and isinstance(output, (str, os.PathLike)):
+        shutil.move(paths[0], output)
+        return
+    import fitz  # PyMuPDF
+
+    merged = fitz.open()
+    try:
+        for path in paths:
+            with fitz.open(path) as part:
+                merged.insert_pdf(part)
+            os.remove(path)
+        merged.save(output, garbage=1, deflate=True)
+    finally:
+        merged.close()
+
+
+# --- Batch rendering ---
+
+def _load_statement(statement):
+    """Structured data may be passed as a dict or as a path to its JSON file."""
+    if isinstance(statement, dict):
+        return statement
+    with open(statement, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _render_one(statement, output_path):
+    generate_summary_pdf(_load_statement(statement), output_path)
+    return output_path
+
+
+def generate_summary_reports(statements, output_dir=None, consolidated_path=None, workers=None):
+    """
+    Renders summary reports for many parsed statements in parallel workers.
+
+    'statements' holds structured dicts or paths to their JSON files.
+    - output_dir: one '<n>_<card>.pdf' (or '<json name>.pdf') per statement;
+      returns the list of paths.
+    - consolidated_path: one PDF with every statement's summary in order;
+      parts are rendered in parallel and then joined. Returns that path.
+    """
+    if (output_dir is None) == (consolidated_path is None):
+        raise ValueError("Pass exactly one of output_dir or consolidated_path.")
+
+    tmp_dir = None
+    if consolidated_path is not None:
+        tmp_dir = tempfile.mkdtemp(prefix="summary_reports_")
+        target_dir = tmp_dir
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+        target_dir = output_dir
+
+    outputs = []
+    for i, statement in enumerate(statements):
+        if isinstance(statement, dict):
+            name = f"{i:05d}_{statement.get('card_last4') or 'statement'}"
+        else:
+            name = os.path.splitext(os.path.basename(statement))[0]
+        outputs.append(os.path.join(target_dir, f"{name}.pdf"))
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_render_one, statements, outputs))
+        if consolidated_path is None:
+            return outputs
+        _join_pdfs(outputs, consolidated_path)
+        return consolidated_path
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
 
 
 def save_json_output(data, output_path):
@@ -118,3 +284,37 @@ def save_json_output(data, output_path):
     except Exception as e:
         print(f"Error saving JSON: {e}")
 
+
+def _split_statement(data):
+    """Columnar transactions plus the remaining key fields as metadata."""
+    from modules.columnar import TransactionTable
+
+    transactions = data.get("transactions", [])
+    if not isinstance(transactions, TransactionTable):
+        transactions = TransactionTable.from_records(transactions)
+    metadata = {k: v for k, v in data.items() if k != "transactions"}
+    return transactions, metadata
+
+
+def save_parquet_output(data, output_path):
+    """
+    Saves the transactions as a Parquet file (typed columns: date32 dates,
+    int64 minor-unit amounts, dictionary-encoded text). The statement's key
+    fields are stored in the file's schema metadata. Needs pyarrow.
+    """
+    try:
+        transactions, metadata = _split_statement(data)
+        transactions.write_parquet(output_path, metadata)
+        print(f"Parquet output saved to {output_path}")
+    except Exception as e:
+        print(f"Error saving Parquet: {e}")
+
+
+def save_arrow_output(data, output_path):
+    """Same as save_parquet_output(), as an Arrow IPC (Feather v2) file."""
+    try:
+        transactions, metadata = _split_statement(data)
+        transactions.write_ipc(output_path, metadata)
+        print(f"Arrow output saved to {output_path}")
+    except Exception as e:
+        print(f"Error saving Arrow: {e}")
@@ -0,0 +1,443 @@
+"""
+SQLite store of parsed statements and their transactions, for questions
+that span many statements ("spend per merchant over the last 12 months")
+without re-parsing or re-reading every JSON file.
+
+    python -m modules.store ingest statements.db batch_output/
+    python -m modules.store merchants statements.db --card 1234 --months 12
+    python -m modules.store categories statements.db --card 1234 --months 12
+    python -m modules.store monthly statements.db --card 1234
+    python -m modules.store merchant statements.db "amazon mktplace"
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from modules.table_extractor import DATE_FORMATS, date_format
+from modules.text_parser import normalize_description
+
+DEFAULT_STORE_PATH = "statements.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statements (
+    id INTEGER PRIMARY KEY,
+    source TEXT UNIQUE,
+    card_last4 TEXT,
+    period_start TEXT,
+    period_end TEXT,
+    payment_due_date TEXT,
+    total_due_minor INTEGER,
+    minimum_due_minor INTEGER,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    statement_id INTEGER NOT NULL REFERENCES statements(id),
+    card_last4 TEXT,
+    date TEXT,
+    date_text TEXT,
+    description TEXT,
+    description_norm TEXT,
+    amount_minor INTEGER NOT NULL,
+    type TEXT,
+    category TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_statements_card_period ON statements(card_last4, period_start, period_end);
+"""
+
+# Transaction indexes; dropped and rebuilt around bulk loads (see ingest)
+TRANSACTION_INDEXES = {
+    "ix_transactions_statement": "transactions(statement_id)",
+    "ix_transactions_card_date": "transactions(card_last4, date)",
+    "ix_transactions_date": "transactions(date)",
+    "ix_transactions_merchant": "transactions(description_norm, date)",
+}
+
+
+@lru_cache(maxsize=8192)
+def iso_date(text, fmt=None):
+    """
+    Statement date text -> 'YYYY-MM-DD', or None. 'fmt' is the statement's
+    format (see statement_date_formats); without it DATE_FORMATS are tried
+    in order, which reads an ambiguous date like 05/10/2025 month-first.
+    """
+    if not text:
+        return None
+    text = text.strip()
+    for f in (fmt,) if fmt else DATE_FORMATS:
+        try:
+            return datetime.strptime(text, f).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def statement_date_formats(data):
+    """
+    (header format, transaction format) for one structured statement, each
+    chosen once with table_extractor.date_format, so a DD/MM statement is
+    read day-first on every row. The header dates (period, due date) use the
+    transactions' format when it parses all of them.
+    """
+    transaction_fmt = date_format([tx.get("date") for tx in data.get("transactions") or []])
+    period = data.get("statement_period") or {}
+    header = [d for d in (period.get("from"), period.get("to"), data.get("payment_due_date")) if d]
+    if transaction_fmt and all(iso_date(d, transaction_fmt) for d in header):
+        return transaction_fmt, transaction_fmt
+    return date_format(header), transaction_fmt
+
+
+# Descriptions repeat heavily across statements (same merchants every month)
+_normalize = lru_cache(maxsize=1 << 16)(normalize_description)
+
+
+def amount_minor(text):
+    """'1,234.56' / '₹1234.5 CR' -> 123456 / 123450 (minor units), or None."""
+    if text is None:
+        return None
+    # Fast path for the 'x.yy' strings in the JSON output
+    whole, _, fraction = str(text).replace(",", "").partition(".")
+    if whole.isdigit() and len(fraction) <= 2 and (fraction.isdigit() or not fraction):
+        return int(whole) * 100 + int(fraction.ljust(2, "0"))
+    digits = "".join(ch for ch in str(text) if ch.isdigit() or ch == ".")
+    whole, _, fraction = digits.partition(".")
+    if not whole and not fraction:
+        return None
+    fraction = fraction.replace(".", "")[:2].ljust(2, "0")
+    return int(whole or 0) * 100 + int(fraction)
+
+
+class TransactionStore:
+    """
+    Statements and transactions in one SQLite file.
+
+    Dates are stored as ISO text and amounts as integer minor units, so
+    range filters and sums are plain index range scans. Indexes cover
+    card_last4, the statement period, transaction date and the normalized
+    description (see text_parser.normalize_description).
+
+    Re-ingesting a statement with the same 'source' replaces it.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Keep index pages in memory during bulk loads (64 MiB)
+        self._conn.execute("PRAGMA cache_size=-65536")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._create_indexes()
+
+    def _migrate(self):
+        """Adds columns introduced after a store file was created."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(transactions)")}
+        if "category" not in columns:
+            self._conn.execute("ALTER TABLE transactions ADD COLUMN category TEXT")
+            self._conn.commit()
+
+    def _create_indexes(self):
+        for name, target in TRANSACTION_INDEXES.items():
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+        self._conn.commit()
+
+    # --- Ingestion ---
+
+    def ingest(self, statements, bulk=False):
+        """
+        Inserts structured statements (the dicts produced by structure_data,
+        optionally with a 'source' key) in a single transaction.
+        Returns (statements, transactions) inserted.
+
+        bulk=True drops the transaction indexes for the load and rebuilds
+        them afterwards, which is several times faster for large batches
+        (but slower when adding a few statements to a large store).
+        """
+        n_statements = n_transactions = 0
+        now = datetime.now().isoformat(timespec="seconds")
+        if bulk:
+            for name in TRANSACTION_INDEXES:
+                if name != "ix_transactions_statement":  # needed to replace re-ingested sources
+                    self._conn.execute(f"DROP INDEX IF EXISTS {name}")
+        try:
+            n_statements, n_transactions = self._insert(statements, now)
+        finally:
+            if bulk:
+                self._create_indexes()
+        return n_statements, n_transactions
+
+    def _insert(self, statements, now):
+        n_statements = n_transactions = 0
+        with self._conn:
+            cur = self._conn.cursor()
+            for data in statements:
+                source = data.get("source")
+                if source is not None:
+                    self._delete_source(cur, source)
+                card = data.get("card_last4")
+                period = data.get("statement_period") or {}
+                header_fmt, tx_fmt = statement_date_formats(data)
+                cur.execute(
+                    "INSERT INTO statements (source, card_last4, period_start, period_end, payment_due_date, "
+                    "total_due_minor, minimum_due_minor, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (source, card, iso_date(period.get("from"), header_fmt), iso_date(period.get("to"), header_fmt),
+                     iso_date(data.get("payment_due_date"), header_fmt), amount_minor(data.get("total_due")),
+                     amount_minor(data.get("minimum_due")), now))
+                statement_id = cur.lastrowid
+                rows = [(statement_id, card, iso_date(tx.get("date"), tx_fmt), tx.get("date"), tx.get("description"),
+                         _normalize(tx.get("description", "")), amount_minor(tx.get("amount")) or 0,
+                         tx.get("type"), tx.get("category"))
+                        for tx in data.get("transactions", [])]
+                cur.executemany(
+                    "INSERT INTO transactions (statement_id, card_last4, date, date_text, description, "
+                    "description_norm, amount_minor, type, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                n_statements += 1
+                n_transactions += len(rows)
+        return n_statements, n_transactions
+
+    @staticmethod
+    def _delete_source(cur, source):
+        row = cur.execute("SELECT id FROM statements WHERE source = ?", (source,)).fetchone()
+        if row:
+            cur.execute("DELETE FROM transactions WHERE statement_id = ?", row)
+            cur.execute("DELETE FROM statements WHERE id = ?", row)
+
+    def ingest_files(self, paths, bulk=False):
+        """
+        Ingests per-statement JSON files, and JSONL files (optionally .gz)
+        written by the JSONL sink in per-statement mode. Directories are
+        searched recursively. Returns (statements, transactions) inserted.
+        """
+        return self.ingest(_load_statements(paths), bulk=bulk)
+
+    # --- Queries ---
+
+    def spend_by_merchant(self, card_last4=None, since=None, until=None, limit=20, type="debit"):
+        """[(description_norm, count, total_minor)] ordered by total, largest first."""
+        sql, params = self._filtered(
+            "SELECT description_norm, COUNT(*), SUM(amount_minor) FROM transactions",
+            card_last4, since, until, type)
+        sql += " GROUP BY description_norm ORDER BY 3 DESC LIMIT ?"
+        return self._conn.execute(sql, params + [limit]).fetchall()
+
+    def spend_by_category(self, card_last4=None, since=None, until=None, type="debit"):
+        """[(category, count, total_minor)] ordered by total, largest first."""
+        sql, params = self._filtered(
+            "SELECT COALESCE(category, 'uncategorized'), COUNT(*), SUM(amount_minor) FROM transactions",
+            card_last4, since, until, type)
+        sql += " GROUP BY 1 ORDER BY 3 DESC"
+        return self._conn.execute(sql, params).fetchall()
+
+    def monthly_totals(self, card_last4=None, since=None, until=None, type="debit"):
+        """[('YYYY-MM', count, total_minor)] in month order."""
+        sql, params = self._filtered(
+            "SELECT substr(date, 1, 7) AS month, COUNT(*), SUM(amount_minor) FROM transactions",
+            card_last4, since, until, type)
+        sql += " GROUP BY month ORDER BY month"
+        return self._conn.execute(sql, params).fetchall()
+
+    def merchant_transactions(self, merchant, since=None, until=None):
+        """
+        Transactions whose normalized description starts with the normalized
+        'merchant' ('amazon' matches 'amazon mktplace'), by date. The prefix
+        is matched as an index range, not a LIKE scan.
+        """
+        prefix = normalize_description(merchant)
+        sql = ("SELECT date, card_last4, description, amount_minor, type FROM transactions "
+               "WHERE description_norm >= ? AND description_norm < ?")
+        params = [prefix, prefix + "\uffff"]
+        if since:
+            sql += " AND date >= ?"
+            params.append(since)
+        if until:
+            sql += " AND date <= ?"
+            params.append(until)
+        return self._conn.execute(sql + " ORDER BY date", params).fetchall()
+
+    def statements(self, card_last4=None, since=None, until=None):
+        """[(source, card_last4, period_start, period_end, total_due_minor)] by period."""
+        sql = "SELECT source, card_last4, period_start, period_end, total_due_minor FROM statements WHERE 1 = 1"
+        params = []
+        if card_last4:
+            sql += " AND card_last4 = ?"
+            params.append(card_last4)
+        if since:
+            sql += " AND period_start >= ?"
+            params.append(since)
+        if until:
+            sql += " AND period_start <= ?"
+            params.append(until)
+        return self._conn.execute(sql + " ORDER BY card_last4, period_start", params).fetchall()
+
+    def counts(self):
+        return {
+            "statements": self._conn.execute("SELECT COUNT(*) FROM statements").fetchone()[0],
+            "transactions": self._conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0],
+        }
+
+    def query_plan(self, sql, params=()):
+        """EXPLAIN QUERY PLAN lines, to check that a query uses an index."""
+        return [row[-1] for row in self._conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+    @staticmethod
+    def _filtered(select, card_last4, since, until, type):
+        clauses, params = [], []
+        if card_last4:
+            clauses.append("card_last4 = ?")
+            params.append(card_last4)
+        if since:
+            clauses.append("date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("date <= ?")
+            params.append(until)
+        if type:
+            clauses.append("type = ?")
+            params.append(type)
+        if clauses:
+            select += " WHERE " + " AND ".join(clauses)
+        return select, params
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _expand(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for ext in ("json", "jsonl", "jsonl.gz"):
+                yield from sorted(glob.glob(os.path.join(path, "**", f"*.{ext}"), recursive=True))
+        else:
+            yield path
+
+
+def _load_statements(paths):
+    for path in _expand(paths):
+        name = os.path.basename(path)
+        if name == "batch_summary.json":
+            continue
+        try:
+            if ".jsonl" in name:
+                yield from read_jsonl(path)
+            else:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict) and isinstance(data.get("transactions"), list):
+                    yield dict(data, source=data.get("source") or os.path.abspath(path))
+        except (OSError, ValueError) as e:
+            print(f"Store: skipping {path}: {e}")
+
+
+def read_jsonl(path, offset=0):
+    """
+    Statements from a per-statement JSONL file (plain or .gz), starting at
+    byte 'offset'. Passing the file's size from before a batch appended to
+    it reads just that batch: the sink starts each run on a new line (and,
+    gzipped, a new gzip member), so the offset is a valid place to start.
+    """
+    if path.endswith(".zst"):
+        raise ValueError("zstd-compressed JSONL can't be read here; use .jsonl or .jsonl.gz")
+    with open(path, "rb") as raw:
+        raw.seek(offset)
+        stream = gzip.GzipFile(fileobj=raw) if path.endswith(".gz") else raw
+        for line in stream:
+            if line.strip():
+                data = json.loads(line)
+                if isinstance(data.get("transactions"), list):
+                    yield data
+
+
+# --- CLI ---
+
+def _since(args):
+    if args.since:
+        return args.since
+    if args.months:
+        return (date.today() - timedelta(days=round(args.months * 30.44))).isoformat()
+    return None
+
+
+def _money(minor):
+    return f"{(minor or 0) / 100:,.2f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m modules.store", description="Query parsed statements in SQLite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="Load statement JSON / JSONL files or directories")
+    ingest.add_argument("db")
+    ingest.add_argument("paths", nargs="+")
+    ingest.add_argument("--bulk", action="store_true",
+                        help="Rebuild indexes after loading (faster for large loads)")
+    ingest.add_argument("--dedupe", metavar="INDEX",
+                        help="Skip statements already in this fingerprint index and drop overlapping "
+                             "transactions (see modules.fingerprints); the index is updated")
+
+    for name, help_text in (("merchants", "Spend per merchant"), ("categories", "Spend per category"),
+                            ("monthly", "Spend per month"),
+                            ("merchant", "Transactions of one merchant"), ("statements", "Ingested statements")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("db")
+        if name == "merchant":
+            p.add_argument("name")
+        else:
+            p.add_argument("--card", help="Card last 4 digits")
+        p.add_argument("--since", help="From date (YYYY-MM-DD)")
+        p.add_argument("--until", help="To date (YYYY-MM-DD)")
+        p.add_argument("--months", type=float, help="Shortcut for --since N months ago")
+        if name == "merchants":
+            p.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with TransactionStore(args.db) as store:
+        if args.command == "ingest":
+            start = time.perf_counter()
+            if args.dedupe:
+                from modules.fingerprints import FingerprintIndex
+                with FingerprintIndex(args.dedupe) as index:
+                    statements, transactions = store.ingest(index.filter(_load_statements(args.paths)),
+                                                            bulk=args.bulk)
+                print(f"Skipped {index.duplicates} duplicate statements and "
+                      f"{index.overlaps} overlapping transactions.")
+            else:
+                statements, transactions = store.ingest_files(args.paths, bulk=args.bulk)
+            print(f"Ingested {statements} statements ({transactions} transactions) "
+                  f"in {time.perf_counter() - start:.2f}s. Store now holds {store.counts()}.")
+        elif args.command == "merchants":
+            for merchant, count, total in store.spend_by_merchant(args.card, _since(args), args.until, args.limit):
+                print(f"{_money(total):>14}  {count:>6}  {merchant}")
+        elif args.command == "categories":
+            for category, count, total in store.spend_by_category(args.card, _since(args), args.until):
+                print(f"{_money(total):>14}  {count:>6}  {category}")
+        elif args.command == "monthly":
+            for month, count, total in store.monthly_totals(args.card, _since(args), args.until):
+                print(f"{month}  {_money(total):>14}  {count:>6}")
+        elif args.command == "merchant":
+            for day, card, description, amount, type_ in store.merchant_transactions(
+                    args.name, _since(args), args.until):
+                print(f"{day}  {card or '----'}  {_money(amount):>12} {type_:<6}  {description}")
+        elif args.command == "statements":
+            for source, card, start, end, total in store.statements(args.card, _since(args), args.until):
+                print(f"{card or '----'}  {start} .. {end}  {_money(total):>12}  {source}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+Supervised worker pool for batch parsing.
+
+concurrent.futures.ProcessPoolExecutor cannot stop a task once it has
+started, so one PDF that hangs Camelot/Ghostscript or balloons memory stalls
+its worker (and, if it dies, breaks the whole pool). Here every worker is a
+plain process fed one task at a time over a pipe, and the parent watches it:
+
+  - a task running longer than 'timeout' seconds gets its worker killed
+  - a worker whose RSS goes over 'max_rss_mb' is killed mid-task, or
+    retired after the task if it only crossed the limit at the end
+  - a worker is retired after 'max_tasks' tasks, which returns memory that
+    the PDF libraries never give back
+  - a worker that dies (segfault, OOM killer) only fails its own task
+
+Killed and retired workers are replaced, so the pool keeps its size and
+the rest of the batch keeps flowing.
+"""
+import os
+import time
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+# How often busy workers are checked for deadlines and memory (seconds).
+POLL_INTERVAL = 0.25
+# Workers failing to start this many times in a row means the initializer
+# itself is broken; the pool gives up instead of respawning forever.
+MAX_SPAWN_FAILURES = 5
+
+
+def rss_bytes(pid=None):
+    """
+    Resident set size of a process in bytes, or None if it can't be read.
+    Uses /proc on Linux and psutil (if installed) elsewhere.
+    """
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return None
+
+
+def _worker_main(conn, initializer, initargs, max_rss):
+    """Worker loop: run (task_id, func, args) messages until told to stop."""
+    if initializer is not None:
+        initializer(*initargs)
+    # Tasks are only sent once the worker is ready, so slow start-up (e.g.
+    # importing the PDF libraries) never counts against a task's timeout.
+    conn.send("ready")
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+        task_id, func, args = message
+        try:
+            value, error = func(*args), None
+        except Exception as e:
+            value, error = None, f"{type(e).__name__}: {e}"
+        rss = rss_bytes()
+        retire = bool(max_rss and rss and rss > max_rss)
+        conn.send((task_id, value, error, retire))
+        if retire:
+            break
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, ctx, initializer, initargs, max_rss):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, initializer, initargs, max_rss),
+                                   daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task = None
+        self.started = None
+        self.deadline = None
+        self.done = 0
+
+    def send(self, task_id, func, args, timeout):
+        self.task = task_id
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout if timeout else None
+        self.conn.send((task_id, func, args))
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SupervisedPool:
+    """
+    Process pool with per-task timeouts, a per-worker RSS cap and worker
+    recycling. Tasks are submitted with submit(key, func, *args) (func must
+    be picklable, i.e. a module-level function) and collected with
+    results(), which yields (key, value, error, wall_time) as tasks finish.
+    error is None on success, or a message such as 'timeout after 120s'.
+    More tasks can be submitted while results() is being iterated.
+
+    'timeout', 'max_rss_mb' and 'max_tasks' are all optional; without them
+    this behaves like an ordinary process pool.
+    """
+
+    def __init__(self, workers=None, timeout=None, max_rss_mb=None, max_tasks=None,
+                 initializer=None, initargs=()):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_rss = int(max_rss_mb * 1024 * 1024) if max_rss_mb else None
+        self.max_tasks = max_tasks
+        self._ctx = multiprocessing.get_context()
+        self._initializer = initializer
+        self._initargs = initargs
+        self._queue = deque()
+        self._idle = []
+        self._starting = {}  # conn -> _Worker, not yet through its initializer
+        self._busy = {}  # conn -> _Worker
+        self._next_id = 0
+        self._keys = {}
+        self.recycled = 0
+        self.killed = 0
+        self.spawn_failures = 0
+        self._failed_in_a_row = 0
+
+    def submit(self, key, func, *args):
+        self._queue.append((self._next_id, func, args))
+        self._keys[self._next_id] = key
+        self._next_id += 1
+
+    def results(self):
+        while self._queue or self._busy:
+            self._dispatch()
+            for conn in wait(list(self._busy) + list(self._starting), timeout=self._wait_time()):
+                if conn in self._starting:
+                    self._started(conn)
+                    continue
+                worker = self._busy.pop(conn)
+                try:
+                    task_id, value, error, retire = conn.recv()
+                except (EOFError, OSError):
+                    worker.kill()
+                    yield (self._keys.pop(worker.task), None,
+                           f"worker died (exit code {worker.process.exitcode})", worker.elapsed())
+                    continue
+                worker.done += 1
+                elapsed = worker.elapsed()
+                self._release(worker, retire)
+                yield self._keys.pop(task_id), value, error, elapsed
+            yield from self._enforce_limits()
+
+    def close(self):
+        for worker in self._idle:
+            worker.stop()
+        for worker in list(self._busy.values()) + list(self._starting.values()):
+            worker.kill()
+        self._idle = []
+        self._starting = {}
+        self._busy = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- internals ---
+
+    def _dispatch(self):
+        while self._queue and self._idle:
+            worker = self._idle.pop()
+            task_id, func, args = self._queue.popleft()
+            worker.send(task_id, func, args, self.timeout)
+            self._busy[worker.conn] = worker
+        # Top the pool back up; new workers get tasks once they report ready
+        missing = min(len(self._queue), self.workers - len(self._busy) - len(self._starting) - len(self._idle))
+        for _ in range(missing):
+            worker = _Worker(self._ctx, self._initializer, self._initargs, self.max_rss)
+            self._starting[worker.conn] = worker
+
+    def _started(self, conn):
+        """A starting worker reported in: it is idle now, or it died and _dispatch will replace it."""
+        worker = self._starting.pop(conn)
+        try:
+            conn.recv()
+        except (EOFError, OSError):
+            worker.kill()
+            self.spawn_failures += 1
+            self._failed_in_a_row += 1
+            print(f"Worker process failed to start (exit code {worker.process.exitcode}); starting another")
+            if self._failed_in_a_row >= MAX_SPAWN_FAILURES:
+                raise RuntimeError(f"{self._failed_in_a_row} worker processes in a row failed to start")
+            return
+        self._failed_in_a_row = 0
+        self._idle.append(worker)
+
+    def _release(self, worker, retire):
+        worker.task = worker.deadline = None
+        if retire or (self.max_tasks and worker.done >= self.max_tasks):
+            worker.stop()
+            self.recycled += 1
+        else:
+            self._idle.append(worker)
+
+    def _wait_time(self):
+        wait_time = POLL_INTERVAL if self.max_rss else None
+        deadlines = [w.deadline for w in self._busy.values() if w.deadline is not None]
+        if deadlines:
+            until = max(0.0, min(deadlines) - time.monotonic())
+            wait_time = until if wait_time is None else min(wait_time, until)
+        return wait_time
+
+    def _enforce_limits(self):
+        now = time.monotonic()
+        for conn, worker in list(self._busy.items()):
+            error = None
+            if worker.deadline is not None and now >= worker.deadline:
+                error = f"timeout after {self.timeout:g}s"
+            elif self.max_rss:
+                rss = rss_bytes(worker.process.pid)
+                if rss and rss > self.max_rss:
+                    error = f"memory limit exceeded ({rss / 2**20:.0f} MB > {self.max_rss / 2**20:.0f} MB)"
+            if error is None:
+                continue
+            # The result may have arrived in the meantime; it still counts
+            if conn.poll():
+                continue
+            del self._busy[conn]
+            worker.kill()
+            self.killed += 1
+            yield self._keys.pop(worker.task), None, error, worker.elapsed()
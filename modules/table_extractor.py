@@ -1,97 +1,711 @@
-import camelot
-import pandas as pd
+"""
+Step 4: finding the transaction table in a statement and normalizing it.
+
+Importing this module stays cheap (e.g. for ENGINES): Camelot (OpenCV,
+pdfminer, Ghostscript bindings) is imported only when its engine runs, and
+pandas by the public functions that build or read frames; private helpers
+take and return frames or plain lists.
+"""
+import os
 import re
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+from modules.categorizer import default_categorizer
+from modules.layouts import default_layout_cache
+from modules.pdf_reader import document, spill_to_disk
+from modules.text_parser import detect_issuer
+
+# Engines understood by extract_transactions(). 'auto' tries the fast
+# PyMuPDF word engine first and falls back to Camelot if it finds nothing.
+ENGINES = ("auto", "pymupdf", "camelot")
+
+# Words whose vertical centres are within this many points share a row.
+ROW_TOLERANCE = 3.0
+# A horizontal gap wider than this fraction of the row height starts a new cell.
+CELL_GAP_RATIO = 0.6
+
+# A page without a header still continues the table if it directly follows a
+# table page and has at least this many date-looking lines.
+CONTINUATION_MIN_DATES = 3
+_DATE_LINE_RE = re.compile(r'^\s*\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', re.MULTILINE)
 
-def extract_transactions(file_path):
+# A cached layout template is trusted when at least this share of the
+# non-empty cells in its date column hold a date, and this share of those
+# rows have a description and a cell that is just an amount. Otherwise the
+# table is detected again and the layout re-learned.
+LAYOUT_MIN_ROW_SHARE = 0.6
+_AMOUNT_CELL_RE = r'(?i)^[-(]?\s*[₹$€£]?\s*[\d,]+(?:\.\d{1,2})?\s*\)?\s*(?:cr|dr|-)?$'
+# Points of slack around learned table areas; header positions in the
+# fingerprint are rounded to this many points.
+LAYOUT_SLACK = 4.0
+LAYOUT_GRID = 5
+
+# Long tables can be read by Camelot in parallel: the table pages are split
+# into contiguous shards of at least SHARD_MIN_PAGES pages, one process per
+# shard. This is opt-in: TABLE_WORKERS_ENV sets the processes (default 1,
+# i.e. serial), since every read starts a new pool (~1.3s) and the server and
+# report pools would otherwise each fan out to every core.
+SHARD_MIN_PAGES = 8
+TABLE_WORKERS_ENV = "STATEMENT_TABLE_WORKERS"
+
+
+def extract_transactions(source, engine="auto", as_frame=False):
     """
     Step 4: Detect and parse the transaction table.
-    
+
+    'source' is a path, PDF bytes/buffer, file object or an already open
+    fitz.Document (shared with the text reader, not closed here).
+
+    engine selects how the table is found:
+      'pymupdf' - build rows from PyMuPDF word boxes (fast, no Ghostscript)
+      'camelot' - Camelot 'stream' detection (slow, needs Ghostscript)
+      'auto'    - PyMuPDF first, Camelot as a fallback
+
+    Returns a list of transaction dicts, or with as_frame=True the typed
+    DataFrame produced by normalize_transactions().
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown extraction engine '{engine}'. Choose one of {ENGINES}.")
+
+    try:
+        with document(source) as doc:
+            frame = None
+            if engine in ("auto", "pymupdf"):
+                frame = normalize_transactions(read_table_pymupdf(doc), "PyMuPDF")
+                if frame.empty and engine == "auto":
+                    print("PyMuPDF: No transactions found. Falling back to Camelot.")
+                    frame = None
+
+            if frame is None:
+                frame = normalize_transactions(read_table_camelot(doc), "Camelot")
+    except Exception as e:
+        print(f"An error occurred while opening the PDF for transaction extraction: {e}")
+        frame = normalize_transactions(None, engine)
+
+    return frame if as_frame else frame_to_records(frame)
+
+
+def read_table_camelot(source, layouts=None, workers=None):
+    """
+    Camelot engine: returns the raw transaction table (string cells, header
+    row inside) or None.
+
+    Documents with many table pages are read in shards across up to
+    'workers' processes (default: table_workers()), and the tables merged
+    back in page order before stitching, so a 300-page statement is not
+    stuck on one core.
+
+    Layouts can be learned: after a successful detection the table areas,
+    column positions and column roles are stored in 'layouts' (default:
+    layouts.default_layout_cache(), off unless STATEMENT_LAYOUT_CACHE is
+    set) under the document's layout fingerprint.
+    Later documents with the same fingerprint pass them to Camelot as
+    table_areas/columns and skip detection and header guessing. If the
+    cached layout yields implausible rows, it is dropped and re-learned.
+
     *** THIS SECTION ALSO REQUIRES CUSTOMIZATION ***
     Camelot is a powerful tool, but you may need to 'hint' which table to use
     and which columns correspond to 'date', 'description', and 'amount'.
     """
     try:
-        # 'stream' flavor is often better for statements without clear grid lines
-        tables = camelot.read_pdf(file_path, flavor='stream', pages='all')
-        
+        # Only send pages that actually hold the transaction table to Camelot
+        table_pages = find_table_pages(source)
+        if table_pages:
+            pages = table_pages
+        else:
+            print("Camelot: No transaction header found by pre-scan. Scanning all pages.")
+            with document(source) as doc:
+                pages = list(range(1, doc.page_count + 1))
+        if workers is None:
+            workers = table_workers()
+
+        import camelot
+        import pandas as pd
+
+        if layouts is None:
+            layouts = default_layout_cache()
+        fingerprint = None
+        if layouts is not None and table_pages:
+            fingerprint = layout_fingerprint(source, table_pages[0])
+
+        # 'stream' flavor is often better for statements without clear grid lines.
+        # Camelot only reads files, so in-memory PDFs are spilled to disk here.
+        with spill_to_disk(source) as pdf_path:
+            template = layouts.get(fingerprint) if fingerprint else None
+            if template:
+                frames = _read_with_layout(camelot, pdf_path, table_pages, template, workers)
+                df = pd.concat(frames, ignore_index=True) if frames else None
+                if df is not None:
+                    df.attrs["layout"] = {"header": template["header"], "roles": template["roles"]}
+                if _plausible(df):
+                    return df
+                print("Camelot: Cached layout gave implausible rows. Re-detecting the table.")
+                layouts.reject(fingerprint)
+            tables = _read_pages(pdf_path, pages, workers, flavor='stream')
+
         if not tables:
             print("Camelot: No tables found.")
-            return []
-            
-        # This is an assumption: We guess the longest table is the transaction table
-        transaction_table = max(tables, key=lambda t: t.df.shape[0])
-        df = transaction_table.df
-
-        # --- Table Cleaning Logic (MUST Customize) ---
-        # 1. Find the header row (e.g., the row with 'Date' or 'Description')
-        header_row_index = -1
-        for i, row in df.iterrows():
-            if 'date' in str(row.values).lower() or 'description' in str(row.values).lower():
-                header_row_index = i
-                break
-        
-        if header_row_index == -1:
-            print("Camelot: Could not find transaction table header. Using row 0.")
-            header_row_index = 0
-            # You might have to manually set columns if no header is found
-            # df.columns = ['date', 'description', 'col3', 'amount', 'col5']
-
-        # 2. Set the correct header
-        new_header = df.iloc[header_row_index]
-        df = df[header_row_index+1:]
-        df.columns = new_header
-        
-        # 3. Standardize column names (Guessing common names)
-        # You MUST map your statement's columns here
-        col_map = {}
-        for col in df.columns:
-            col_str = str(col).lower()
-            if 'date' in col_str:
-                col_map[col] = 'date'
-            elif 'description' in col_str or 'details' in col_str:
-                col_map[col] = 'description'
-            elif 'amount' in col_str:
-                col_map[col] = 'amount'
-        
-        df = df.rename(columns=col_map)
-        
-        # 4. Filter to only essential columns
-        if 'date' not in df.columns or 'description' not in df.columns or 'amount' not in df.columns:
-            print("Camelot: Failed to map essential columns (date, description, amount).")
-            print(f"Found columns: {list(df.columns)}")
-            return []
-            
-        df = df[['date', 'description', 'amount']]
-        df = df.dropna() # Drop rows where essential data is missing
-
-        # 5. Format data and determine transaction 'type'
-        transactions = []
-        for _, row in df.iterrows():
-            amount_str = str(row['amount']).replace(',', '')
-            # Simple heuristic: "CR" or credit words imply 'credit'
-            # This logic will need to be adapted
-            is_credit = 'cr' in amount_str.lower() or 'payment' in str(row['description']).lower()
-            
-            # Clean amount string to be just a number
-            amount_val = re.sub(r'[^0-9\.]', '', amount_str)
-            if not amount_val:
-                continue
+            return None
 
-            transactions.append({
-                "date": str(row['date']).strip(),
-                "description": str(row['description']).strip(),
-                "amount": amount_val,
-                "type": "credit" if is_credit else "debit"
-            })
-            
-        return transactions
+        if fingerprint:
+            template = _learn_layout(tables)
+            if template:
+                layouts.put(fingerprint, template)
+        return pd.concat(_stitch_tables([t.df for t in tables]), ignore_index=True)
 
     except Exception as e:
         print(f"An error occurred during transaction extraction: {e}")
         # This can happen if Ghostscript is not installed
         print("Please ensure you have Ghostscript installed on your system.")
-        return []
-    
+        return None
+
+
+def table_workers():
+    """
+    Processes used for sharded Camelot reads: TABLE_WORKERS_ENV if set,
+    else 1 (no sharding). Daemonic processes (batch workers, which already
+    keep every core busy) cannot start children and always get 1.
+    """
+    import multiprocessing
+
+    if multiprocessing.current_process().daemon:
+        return 1
+    try:
+        return max(1, int(os.environ.get(TABLE_WORKERS_ENV) or 1))
+    except ValueError:
+        return 1
+
+
+def _shards(pages, workers):
+    """Splits page numbers into at most 'workers' contiguous runs of at least SHARD_MIN_PAGES."""
+    count = min(workers, len(pages) // SHARD_MIN_PAGES)
+    if count <= 1:
+        return [pages]
+    size, extra = divmod(len(pages), count)
+    shards = []
+    start = 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(pages[start:end])
+        start = end
+    return shards
+
+
+def _read_shard(pdf_path, pages, options):
+    """Process-pool task: one shard's tables, in page order."""
+    import camelot
+    return list(camelot.read_pdf(pdf_path, pages=",".join(str(n) for n in pages), **options))
+
+
+def _read_pages(pdf_path, pages, workers=1, **options):
+    """
+    camelot.read_pdf over a list of page numbers. Long lists are split into
+    shards read in parallel processes; the tables come back in page order
+    either way.
+    """
+    shards = _shards(pages, workers)
+    if len(shards) == 1:
+        return _read_shard(pdf_path, pages, options)
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        parts = pool.map(_read_shard, [pdf_path] * len(shards), shards, [options] * len(shards))
+        return [table for part in parts for table in part]
+
+
+# --- Layout templates ---
+
+def layout_fingerprint(source, page_number):
+    """
+    Identifies a statement layout: issuer, page size, and the transaction
+    header's cells with their x-positions (rounded to LAYOUT_GRID points)
+    on the first table page. None if no header row is found there.
+    """
+    import hashlib
+    import json
+
+    with document(source) as doc:
+        issuer = detect_issuer(doc[0].get_text())
+        page = doc[page_number - 1]
+        for row in _group_rows(page.get_text("words")):
+            if _is_header(" ".join(w[4] for w in row)):
+                cells = [(text.lower(), round(x0 / LAYOUT_GRID)) for x0, _, text in _split_cells(row)]
+                key = [issuer, round(page.rect.width), round(page.rect.height), cells]
+                return hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()
+    return None
+
+
+def _learn_layout(tables):
+    """
+    Builds a template from detected Camelot tables: the header table fixes
+    the columns and the first-page area (from the header row down); later
+    tables of the same width give the continuation-page area. Areas run to
+    the bottom of the page, since the next statement may have more rows;
+    footer lines are dropped because they have no date.
+    """
+    for start, table in enumerate(tables):
+        header_row = _header_index(table.df)
+        if header_row >= 0:
+            break
+    else:
+        return None
+
+    header = [str(cell).strip() for cell in table.df.iloc[header_row]]
+    roles = column_roles(header)
+    if {r for r in roles if r} != {"date", "description", "amount"}:
+        return None
+
+    width = table.df.shape[1]
+    used = [table] + [t for t in tables[start + 1:] if t.df.shape[1] == width]
+    boxes = {id(t): _table_bbox(t) for t in used}
+    if None in boxes.values():
+        return None
+    continuation = [boxes[id(t)] for t in used if t.page != table.page]
+    left = min(box[0] for box in boxes.values()) - LAYOUT_SLACK
+    right = max(box[2] for box in boxes.values()) + LAYOUT_SLACK
+    bottom = 0.0
+    first_top = table.rows[header_row][0] + LAYOUT_SLACK
+    # Without a continuation page to learn from, read later pages from the top
+    rest_top = (max(box[3] for box in continuation) + LAYOUT_SLACK) if continuation else table.pdf_size[1]
+
+    return {
+        "columns": ",".join(f"{x1:.1f}" for _, x1 in table.cols[:-1]),
+        "first_area": f"{left:.1f},{first_top:.1f},{right:.1f},{bottom:.1f}",
+        "rest_area": f"{left:.1f},{rest_top:.1f},{right:.1f},{bottom:.1f}",
+        "header": header,
+        "roles": roles,
+    }
+
+
+def _table_bbox(table):
+    """
+    (x1, y1, x2, y2) of a detected Camelot table in PDF points, or None.
+    Camelot only keeps it in the private Table._bbox, so a version without
+    it makes _learn_layout skip learning instead of failing the parse.
+    """
+    bbox = getattr(table, "_bbox", None)
+    try:
+        x1, y1, x2, y2 = (float(v) for v in bbox)
+    except (TypeError, ValueError):
+        return None
+    return x1, y1, x2, y2
+
+
+def _read_with_layout(camelot, pdf_path, table_pages, template, workers=1):
+    """Reads the table pages with the template's areas and columns (no detection); returns their frames."""
+    hints = {"flavor": "stream", "columns": [template["columns"]]}
+    tables = list(camelot.read_pdf(pdf_path, pages=str(table_pages[0]),
+                                   table_areas=[template["first_area"]], **hints))
+    if len(table_pages) > 1:
+        tables += _read_pages(pdf_path, table_pages[1:], workers,
+                              table_areas=[template["rest_area"]], **hints)
+    return [t.df for t in tables]
+
+
+def _plausible(df):
+    """Whether a table read with a cached layout looks like real transactions."""
+    if df is None or df.empty:
+        return False
+    layout = df.attrs["layout"]
+    rows = _apply_layout(df, layout)
+    if rows is None or rows.empty:
+        return False
+    filled = int((df.iloc[:, layout["roles"].index("date")].astype(str).str.strip() != "").sum())
+    good = rows["amount"].str.match(_AMOUNT_CELL_RE) & (rows["description"] != "")
+    return len(rows) >= LAYOUT_MIN_ROW_SHARE * filled and good.mean() >= LAYOUT_MIN_ROW_SHARE
+
+
+def find_table_pages(source):
+    """
+    Cheap PyMuPDF pre-scan: returns the 1-based numbers of pages that carry a
+    transaction table header (Date / Description / Amount), plus pages right
+    after them that continue the table without repeating the header.
+    Marketing inserts and disclosures are left out.
+
+    The header test runs on single rows of words, not the whole page, so
+    summary boxes ('Payment Due Date' ... 'Total Amount Due') and disclosure
+    text that merely mention those words don't count.
+    """
+    pages = []
+    try:
+        with document(source) as doc:
+            for number, page in enumerate(doc, start=1):
+                lines = [" ".join(w[4] for w in row) for row in _group_rows(page.get_text("words"))]
+                if any(_is_header(line) for line in lines):
+                    pages.append(number)
+                elif pages and pages[-1] == number - 1 and \
+                        sum(1 for line in lines if _DATE_LINE_RE.match(line)) >= CONTINUATION_MIN_DATES:
+                    pages.append(number)
+    except Exception as e:
+        print(f"An error occurred while pre-scanning the PDF: {e}")
+    return pages
+
+
+def _header_index(df):
+    """Index of the first row that looks like a transaction header, or -1."""
+    for i, row in enumerate(df.itertuples(index=False)):
+        if _is_header(" ".join(str(v) for v in row)):
+            return i
+    return -1
 
 
-    
+def _stitch_tables(dfs):
+    """
+    Picks the per-page pieces of a multi-page transaction table, in order,
+    for the caller to concatenate.
+
+    The first table with a header row starts the result; later tables with
+    the same number of columns are appended, minus any repeated header, if
+    their first data row holds a date and an amount (so summary boxes and
+    footers of the same width stay out). If no table has a header, the
+    longest one is used alone.
+    """
+    stitched = None
+    for df in dfs:
+        header = _header_index(df)
+        if stitched is None:
+            if header >= 0:
+                stitched = [df.iloc[header:]]
+                width = df.shape[1]
+            continue
+        if df.shape[1] != width:
+            continue
+        body = df.iloc[header + 1:] if header >= 0 else df
+        if _starts_with_transaction(body):
+            stitched.append(body)
+
+    if stitched is None:
+        return [max(dfs, key=lambda d: d.shape[0])]
+    return stitched
+
+
+def _starts_with_transaction(df):
+    """Whether the first non-empty row of a table has a date cell and an amount cell."""
+    for row in df.itertuples(index=False):
+        cells = [str(v).strip() for v in row]
+        if not any(cells):
+            continue
+        return (any(_DATE_LINE_RE.match(c) for c in cells)
+                and any(re.match(_AMOUNT_CELL_RE, c) for c in cells if c))
+    return False
+
+
+def read_table_pymupdf(source):
+    """
+    PyMuPDF engine: rebuilds the raw transaction table from the word boxes
+    returned by page.get_text("words"). Returns None if no table is found.
+
+    Words are clustered into rows by their vertical centre, the first row that
+    looks like a transaction header (Date / Description / Amount) fixes the
+    column boundaries, and every later word is assigned to a column by its
+    horizontal centre.
+    """
+    try:
+        with document(source) as doc:
+            rows = _word_table_rows(doc)
+    except Exception as e:
+        print(f"An error occurred during PyMuPDF transaction extraction: {e}")
+        return None
+
+    if not rows:
+        print("PyMuPDF: No transaction table header found.")
+        return None
+
+    import pandas as pd
+    return pd.DataFrame(rows)
+
+
+def _group_rows(words):
+    """Clusters word tuples into rows (top to bottom, words left to right)."""
+    rows = []
+    current = []
+    current_y = None
+    for w in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        y = (w[1] + w[3]) / 2
+        if current and abs(y - current_y) > ROW_TOLERANCE:
+            rows.append(sorted(current, key=lambda w: w[0]))
+            current = []
+        if not current:
+            current_y = y
+        current.append(w)
+    if current:
+        rows.append(sorted(current, key=lambda w: w[0]))
+    return rows
+
+
+def _split_cells(row):
+    """Merges the words of one row into cells as (x0, x1, text) tuples."""
+    height = max(w[3] - w[1] for w in row)
+    cells = []
+    for w in row:
+        if cells and w[0] - cells[-1][1] <= height * CELL_GAP_RATIO:
+            x0, _, text = cells[-1]
+            cells[-1] = (x0, w[2], f"{text} {w[4]}")
+        else:
+            cells.append((w[0], w[2], w[4]))
+    return cells
+
+
+def _is_header(text):
+    text = text.lower()
+    return 'date' in text and ('description' in text or 'details' in text) and 'amount' in text
+
+
+def _word_table_rows(doc):
+    """
+    Returns the transaction table as a list of string rows, header first.
+    Repeated headers on continuation pages are skipped.
+    """
+    header = None
+    boundaries = []
+    rows = []
+    for page in doc:
+        for row in _group_rows(page.get_text("words")):
+            row_text = " ".join(w[4] for w in row)
+            if _is_header(row_text):
+                if header is None:
+                    cells = _split_cells(row)
+                    header = [text for _, _, text in cells]
+                    # Column boundaries sit halfway across the gap between header cells
+                    boundaries = [(cells[i][1] + cells[i + 1][0]) / 2 for i in range(len(cells) - 1)]
+                    rows.append(header)
+                continue
+            if header is None:
+                continue
+
+            values = [[] for _ in header]
+            for w in row:
+                centre = (w[0] + w[2]) / 2
+                col = sum(1 for b in boundaries if centre > b)
+                values[col].append(w[4])
+            rows.append([" ".join(v) for v in values])
+    return rows
+
+
+# Column dtypes of the frame returned by normalize_transactions()
+TRANSACTION_COLUMNS = {
+    "date": "datetime64[ns]",
+    "date_text": "string",
+    "description": "string",
+    "amount_minor": "int64",
+    "type": "category",  # categories: TRANSACTION_TYPES
+    "category": "category",  # merchant category from modules.categorizer
+}
+TRANSACTION_TYPES = ("debit", "credit")
+
+# Explicit markers on the amount itself decide credit/debit before the
+# categorizer's keyword rules: 'CR' / leading '-' / '(...)' / trailing '-'
+# mean credit, 'DR' means debit.
+_CREDIT_MARK_RE = r'(?i)(?<![a-z])cr(?![a-z])|^\s*[-(]|-\s*$'
+_DEBIT_MARK_RE = r'(?i)(?<![a-z])dr(?![a-z])'
+
+# One format is chosen per date column (see date_format): the first of these
+# that parses every value, so an ambiguous column (all days <= 12) is read
+# month-first.
+DATE_FORMATS = ("%m/%d/%Y", "%d/%m/%Y", "%m/%d/%y", "%d-%m-%Y", "%Y-%m-%d", "%d %b %Y", "%d-%b-%Y")
+
+
+def date_format(values):
+    """
+    The DATE_FORMATS entry to read a column of date strings with: the first
+    one that parses every non-empty value, else (stray non-date rows) the
+    one that parses the most. None if nothing parses.
+
+    Choosing once per column keeps a DD/MM statement from being read as
+    MM/DD wherever the day happens to be 12 or less. Only distinct values
+    are tried, so this stays cheap per statement.
+    """
+    counts = Counter(v.strip() for v in values if isinstance(v, str))
+    counts.pop("", None)
+    total = sum(counts.values())
+    best, best_count = None, 0
+    for fmt in DATE_FORMATS:
+        count = sum(n for text, n in counts.items() if _matches(text, fmt))
+        if count == total and count:
+            return fmt
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+@lru_cache(maxsize=8192)
+def _matches(text, fmt):
+    try:
+        datetime.strptime(text, fmt)
+        return True
+    except ValueError:
+        return False
+
+
+def _parse_dates(text, fmt=None):
+    """Parses a Series of date strings with one format (date_format(text) by default); NaT elsewhere."""
+    import pandas as pd
+
+    fmt = fmt or date_format(text)
+    if fmt is None:
+        return pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    return pd.to_datetime(text.astype(str).str.strip(), format=fmt, errors="coerce").astype("datetime64[ns]")
+
+
+def _column_role(name):
+    """'date', 'description' or 'amount' for a header cell, else None."""
+    # You MUST map your statement's columns here
+    col_str = str(name).lower()
+    if 'date' in col_str:
+        return 'date'
+    if 'description' in col_str or 'details' in col_str:
+        return 'description'
+    if 'amount' in col_str:
+        return 'amount'
+    return None
+
+
+def column_roles(header):
+    """Role of each header cell; only the first column of each role is used."""
+    roles, seen = [], set()
+    for cell in header:
+        role = _column_role(cell)
+        roles.append(role if role not in seen else None)
+        seen.add(role)
+    return roles
+
+
+def _map_columns(df, source):
+    """
+    Steps 1-4: finds the header row and the date/description/amount columns
+    by their names. Returns a frame with just those columns, or None.
+    """
+    # --- Table Cleaning Logic (MUST Customize) ---
+    # 1. Find the header row (e.g., the row with 'Date' or 'Description')
+    lowered = df.astype(str).apply(lambda col: col.str.lower())
+    header_rows = lowered.apply(lambda col: col.str.contains('date|description', regex=True)).any(axis=1)
+    if header_rows.any():
+        header_row_index = int(header_rows.to_numpy().argmax())
+    else:
+        print(f"{source}: Could not find transaction table header. Using row 0.")
+        header_row_index = 0
+        # You might have to manually set columns if no header is found
+        # df.columns = ['date', 'description', 'col3', 'amount', 'col5']
+
+    # 2. Set the correct header
+    new_header = df.iloc[header_row_index]
+    df = df.iloc[header_row_index+1:]
+    df.columns = new_header
+
+    # 3. Standardize column names (Guessing common names)
+    col_map = {col: role for col in df.columns if (role := _column_role(col))}
+
+    df = df.rename(columns=col_map)
+    df = df.loc[:, ~df.columns.duplicated()]  # e.g. 'Txn Date' and 'Post Date'
+
+    # 4. Filter to only essential columns
+    if 'date' not in df.columns or 'description' not in df.columns or 'amount' not in df.columns:
+        print(f"{source}: Failed to map essential columns (date, description, amount).")
+        print(f"Found columns: {list(df.columns)}")
+        return None
+
+    return df[['date', 'description', 'amount']].dropna() # Drop rows where essential data is missing
+
+
+def _apply_layout(df, layout):
+    """
+    Maps columns by a cached layout template's roles instead of guessing.
+    Only rows with a parseable date are kept, which drops repeated headers,
+    wrapped description lines and page footers. None if the shape doesn't fit.
+    """
+    roles = layout["roles"]
+    if df.shape[1] != len(roles):
+        return None
+    picked = {role: i for i, role in enumerate(roles) if role}
+    if set(picked) != {"date", "description", "amount"}:
+        return None
+    cells = df.astype(str).apply(lambda col: col.str.strip())
+    mapped = cells.iloc[:, [picked["date"], picked["description"], picked["amount"]]]
+    mapped.columns = ["date", "description", "amount"]
+    return mapped[_parse_dates(mapped["date"]).notna()]
+
+
+def normalize_transactions(df, source):
+    """
+    Turns a raw table (header row somewhere inside, string cells) into a
+    typed transaction frame, using whole-column pandas operations:
+
+      date          datetime64, one DATE_FORMATS entry per statement; rows whose
+                    date doesn't match it are dropped (summary and footer lines)
+      date_text     the date as printed on the statement
+      description   string
+      amount_minor  int64, amount in minor units (cents/paise)
+      type          categorical 'debit' / 'credit'
+      category      categorical merchant category ('uncategorized' if no keyword matched)
+
+    A table read with a cached layout template (df.attrs["layout"]) already
+    knows its header and column roles, so steps 1-4 are skipped for it.
+    """
+    import pandas as pd
+
+    mapped = None
+    if df is not None and not df.empty:
+        layout = df.attrs.get("layout")
+        mapped = _apply_layout(df, layout) if layout else None
+        if mapped is None:
+            mapped = _map_columns(df, source)
+    if mapped is None:
+        frame = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in TRANSACTION_COLUMNS.items()})
+        frame["type"] = pd.Categorical([], categories=TRANSACTION_TYPES)
+        return frame
+    df = mapped
+
+    # 5. Clean amounts into exact minor units, categorize each distinct
+    #    description once and determine transaction 'type': amount markers
+    #    first, then the categorizer's keyword rules, otherwise debit
+    amount_text = df['amount'].astype(str).str.replace(',', '', regex=False)
+    description = df['description'].astype(str).str.strip()
+    category, keyword_type = default_categorizer().classify_series(description)
+    marked_debit = amount_text.str.contains(_DEBIT_MARK_RE, regex=True)
+    is_credit = (amount_text.str.contains(_CREDIT_MARK_RE, regex=True)
+                 | (~marked_debit & (keyword_type == "credit")))
+
+    digits = amount_text.str.replace(r'[^0-9\.]', '', regex=True)
+    keep = digits.str.contains(r'\d', regex=True)
+    date_text = df['date'].astype(str).str.strip()
+    fmt = date_format(date_text[keep])
+    dates = _parse_dates(date_text, fmt)
+    if fmt is not None:
+        # Rows after the table (totals, rewards summaries, footers with phone
+        # numbers) have an amount-like cell but no date in the date column
+        keep &= dates.notna()
+    parts = digits[keep].str.extract(r'^(\d*)\.?(\d*)')
+    whole = parts[0].mask(parts[0] == '', '0').astype('int64')
+    fraction = parts[1].str[:2].str.ljust(2, '0').astype('int64')
+
+    date_text = date_text[keep]
+    frame = pd.DataFrame({
+        "date": dates[keep],
+        "date_text": date_text.astype("string"),
+        "description": description[keep].astype("string"),
+        "amount_minor": whole * 100 + fraction,
+        "type": pd.Categorical(is_credit[keep].map({True: "credit", False: "debit"}),
+                               categories=TRANSACTION_TYPES),
+        "category": category[keep].astype("category"),
+    })
+    return frame.reset_index(drop=True)
+
+
+def frame_to_records(frame):
+    """
+    Converts a normalized frame into the list-of-dicts shape used in the JSON
+    output: dates as printed, amounts as plain decimal strings ('1234.56').
+    """
+    import pandas as pd
+    amount = ((frame["amount_minor"] // 100).astype(str) + "."
+              + (frame["amount_minor"] % 100).astype(str).str.zfill(2))
+    records = pd.DataFrame({
+        "date": frame["date_text"].astype(object),
+        "description": frame["description"].astype(object),
+        "amount": amount.astype(object),
+        "type": frame["type"].astype(object),
+        "category": frame["category"].astype(object),
+    })
+    return records.to_dict("records")
@@ -1,22 +1,83 @@
 import re
 
+# Blank-line runs collapse to one newline; runs of spaces/tabs to one space.
+_CLEAN_RE = re.compile(r'(\n\s*\n)|[ \t]+')
+
 def clean_text(text):
     """
     Step 2: Remove unnecessary line breaks and extra whitespace.
+    Both substitutions are done in a single pass over the text.
+    """
+    return _CLEAN_RE.sub(lambda m: '\n' if m.group(1) else ' ', text)
+
+
+# --- Field-extraction templates ---
+#
+# *** THIS IS THE MOST IMPORTANT SECTION TO CUSTOMIZE ***
+# Each issuer gets a template: a 'detect' pattern that recognises its
+# statements and a dict of field patterns. Any field an issuer does not
+# override falls back to GENERIC_PATTERNS. All patterns are matched with
+# re.IGNORECASE and must not use unbounded '.*' (it backtracks badly on
+# long statements).
+
+FIELDS = ("card_last4", "statement_period", "payment_due_date", "total_due", "minimum_due")
+
+GENERIC_PATTERNS = {
+    "card_last4": r'(?:Card|Account) (?:Number|No\.?):?[ \t]*(?:[\dXx*•]+[ \t-]+)*[Xx*•]*(\d{4})\b',
+    "statement_period": r'Statement Period:?\s*([\d/]{8,10})\s*(?:to|-)\s*([\d/]{8,10})',
+    "payment_due_date": r'Payment Due Date:?\s*([\d/]{8,10})',
+    "total_due": r'(?:Total Amount Due|New Balance):?\s*[₹$]?\s*([\d,]+\.\d{2})',
+    "minimum_due": r'Minimum (?:Payment|Amount)(?: Due)?:?\s*[₹$]?\s*([\d,]+\.\d{2})',
+}
+
+# Issuer detection only looks at the top of the document.
+DETECT_WINDOW = 4000
+
+ISSUER_TEMPLATES = {}
+
+
+def _compile_fields(patterns):
+    """
+    One compiled regex per field. Searching fields separately keeps each
+    pattern's literal-prefix scan (much faster than one big alternation)
+    and lets fields that are already found drop out of later pages.
+    """
+    return {field: re.compile(patterns[field], re.IGNORECASE) for field in FIELDS}
+
+
+def register_template(issuer, detect=None, patterns=None):
+    """
+    Adds (or replaces) an issuer template. 'detect' is a regex searched in
+    the first DETECT_WINDOW characters; 'patterns' overrides GENERIC_PATTERNS.
     """
-    # Consolidate multiple newlines into one
-    text = re.sub(r'(\n\s*)+\n', '\n', text)
-    # Consolidate multiple spaces
-    text = re.sub(r'[ \t]+', ' ', text)
-    return text
+    merged = dict(GENERIC_PATTERNS, **(patterns or {}))
+    ISSUER_TEMPLATES[issuer] = {
+        "detect": re.compile(detect, re.IGNORECASE) if detect else None,
+        "fields": _compile_fields(merged),
+    }
+
+
+register_template("generic")
+register_template("global_trust", detect=r'Global Trust Bank')
+
 
-def extract_key_fields(text):
+def detect_issuer(text):
+    """Returns the first issuer whose detect pattern matches, else 'generic'."""
+    head = text[:DETECT_WINDOW]
+    for issuer, template in ISSUER_TEMPLATES.items():
+        if template["detect"] is not None and template["detect"].search(head):
+            return issuer
+    return "generic"
+
+
+def extract_key_fields(text, issuer=None):
     """
-    Step 3: Use regex to extract key fields.
-    
-    *** THIS IS THE MOST IMPORTANT SECTION TO CUSTOMIZE ***
-    You MUST adapt these regex patterns to match your specific PDF statement.
-    The patterns below are generic examples.
+    Step 3: Extract key fields with the issuer's precompiled template.
+
+    'text' is either the whole cleaned text or an iterable of cleaned page
+    texts (e.g. from pdf_reader.iter_pages). Pages are consumed one at a
+    time and reading stops as soon as every field has been found, so later
+    pages are never pulled from the PDF. The first match of each field wins.
     """
     data = {
         "card_last4": None,
@@ -24,43 +85,61 @@ def extract_key_fields(text):
         "statement_period_to": None,
         "payment_due_date": None,
         "total_due": None,
-        "minimum_due": None
-    }
-    
-    # Regex patterns (examples, MUST be customized)
-    # Using re.DOTALL to make '.' match newlines, and re.IGNORECASE
-    patterns = {
-        "card_last4": r'(?:Card|Account) Number.*(\d{4})',
-        "statement_period": r'Statement Period\s*([\d/]{8,10})\s*(?:to|-)\s*([\d/]{8,10})',
-        "payment_due_date": r'Payment Due Date\s*([\d/]{8,10})',
-        "total_due": r'(?:Total Amount Due|New Balance)\s*[₹$]?\s*([\d,]+\.\d{2})',
-        "minimum_due": r'Minimum Payment Due\s*[₹$]?\s*([\d,]+\.\d{2})'
+        "minimum_due": None,
+        "issuer": None
     }
 
-    # Extract Card Last 4
-    match = re.search(patterns["card_last4"], text, re.IGNORECASE)
-    if match:
-        data["card_last4"] = match.group(1)
+    pages = (text,) if isinstance(text, str) else text
+    template = None
+    found = set()
+    try:
+        for page_text in pages:
+            if template is None:
+                # The issuer is detected from the first page
+                issuer = issuer or detect_issuer(page_text)
+                template = ISSUER_TEMPLATES[issuer]
+                data["issuer"] = issuer
+            _scan_fields(page_text, template, data, found)
+            if len(found) == len(FIELDS):
+                break
+    finally:
+        if hasattr(pages, "close"):
+            pages.close()
 
-    # Extract Statement Period
-    match = re.search(patterns["statement_period"], text, re.IGNORECASE | re.DOTALL)
-    if match:
-        data["statement_period_from"] = match.group(1).strip()
-        data["statement_period_to"] = match.group(2).strip()
+    return data
 
-    # Extract Payment Due Date
-    match = re.search(patterns["payment_due_date"], text, re.IGNORECASE | re.DOTALL)
-    if match:
-        data["payment_due_date"] = match.group(1).strip()
 
-    # Extract Total Due
-    match = re.search(patterns["total_due"], text, re.IGNORECASE | re.DOTALL)
-    if match:
-        data["total_due"] = match.group(1).replace(',', '')
+def _scan_fields(text, template, data, found):
+    """Searches text for each field not yet found, filling data."""
+    for field, regex in template["fields"].items():
+        if field in found:
+            continue
+        match = regex.search(text)
+        if match is None:
+            continue
+        found.add(field)
 
-    # Extract Minimum Due
-    match = re.search(patterns["minimum_due"], text, re.IGNORECASE | re.DOTALL)
-    if match:
-        data["minimum_due"] = match.group(1).replace(',', '')
+        if field == "statement_period":
+            data["statement_period_from"] = match.group(1).strip()
+            data["statement_period_to"] = match.group(2).strip()
+        elif field == "card_last4":
+            data["card_last4"] = match.group(1)
+        elif field == "payment_due_date":
+            data["payment_due_date"] = match.group(1).strip()
+        else:  # total_due, minimum_due
+            data[field] = match.group(1).replace(',', '')
 
-    return data
+
+# --- Transaction descriptions ---
+
+# Letter/digit runs that contain a digit (store numbers, references) are
+# dropped; everything else that is not a letter separates words.
+_DESCRIPTION_NOISE_RE = re.compile(r'[a-z]*\d[a-z\d]*|[^a-z]+')
+
+def normalize_description(description):
+    """
+    Canonical form of a transaction description for grouping by merchant:
+    lowercase words only, so store numbers, card references and punctuation
+    ('AMAZON MKTPLACE*2X4K1 #118') don't split one merchant into many.
+    """
+    return " ".join(_DESCRIPTION_NOISE_RE.sub(' ', str(description).lower()).split())
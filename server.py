@@ -0,0 +1,234 @@
+"""
+Async HTTP parsing service.
+
+    python server.py --port 8080 --workers 4 --max-queue 64
+
+Endpoints:
+    POST /parse    PDF as the raw request body (or multipart field 'file');
+                   returns the structured JSON from the parsing pipeline.
+    POST /report   Same input; returns the generate_summary_pdf() bytes.
+    GET  /health   Liveness check.
+    GET  /metrics  Request counters, queue depth, latency and cache stats.
+
+Parsing is CPU-bound, so it runs in a process pool. At most --workers
+documents are parsed at once; up to --max-queue more wait their turn, and
+anything beyond that is rejected with 503 so clients can back off.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from aiohttp import web
+
+from modules.cache import ResultCache, DEFAULT_CACHE_DIR
+from modules.instrumentation import PipelineMetrics
+from modules.pipeline import parse_statement, cache_key
+from modules.report_generator import generate_summary_pdf
+from modules.table_extractor import ENGINES
+
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+
+def _parse_in_worker(pdf_bytes, engine, with_report):
+    """
+    Runs in a pool process: parses one uploaded PDF from memory and
+    optionally renders its summary report.
+    Returns (data, report_bytes, metrics_record).
+    """
+    metrics = PipelineMetrics("upload")
+    data = parse_statement(pdf_bytes, engine=engine, metrics=metrics)
+    report = generate_summary_pdf(data) if data is not None and with_report else None
+    return data, report, metrics.record
+
+
+def _render_in_worker(data):
+    return generate_summary_pdf(data)
+
+
+class ParserService:
+    """Holds the worker pool, admission control and service counters."""
+
+    def __init__(self, workers, max_queue, engine="auto", cache=None, timeout=None):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.slots = asyncio.Semaphore(workers)
+        self.max_queue = max_queue
+        self.engine = engine
+        self.cache = cache
+        self.timeout = timeout
+        self.workers = workers
+        self.in_flight = 0
+        self.queued = 0
+        self.counters = {"requests": 0, "completed": 0, "failed": 0, "rejected": 0,
+                         "timed_out": 0, "cache_hits": 0}
+        self.latencies = deque(maxlen=1000)
+
+    async def _run(self, func, *args):
+        """Waits for a worker slot (bounded queue) and runs func in the pool."""
+        if self.queued >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise web.HTTPServiceUnavailable(
+                text="Parser queue is full, retry later.", headers={"Retry-After": "1"})
+
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.queued -= 1
+
+        # The slot is held until the pool job itself finishes. A request that
+        # times out (or whose client goes away) leaves its job running, and
+        # releasing the slot early would let more jobs than workers pile up
+        # in the executor's unbounded queue.
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        try:
+            job = self.pool.submit(func, *args)
+        except Exception:
+            self._release()
+            raise
+        job.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), self.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timed_out"] += 1
+            raise web.HTTPGatewayTimeout(text="Parsing timed out.")
+
+    def _release(self):
+        self.in_flight -= 1
+        self.slots.release()
+
+    async def parse(self, pdf_bytes, with_report):
+        """Returns (data, report_bytes); served from the cache when possible."""
+        loop = asyncio.get_running_loop()
+        key = data = None
+        if self.cache:
+            # Hashing the upload and reading the disk tier stay off the event loop
+            key, data = await loop.run_in_executor(None, self._cache_lookup, pdf_bytes)
+        if data is not None:
+            self.counters["cache_hits"] += 1
+            report = await self._run(_render_in_worker, data) if with_report else None
+            return data, report
+
+        data, report, _ = await self._run(_parse_in_worker, pdf_bytes, self.engine, with_report)
+        if data is not None and self.cache:
+            await loop.run_in_executor(None, self.cache.put, key, data)
+        return data, report
+
+    def _cache_lookup(self, pdf_bytes):
+        key = cache_key(pdf_bytes, self.engine)
+        return key, self.cache.get(key)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+        stats = dict(self.counters, in_flight=self.in_flight, queued=self.queued,
+                     workers=self.workers, max_queue=self.max_queue)
+        if latencies:
+            stats["latency_p50"] = statistics.median(latencies)
+            stats["latency_p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        if self.cache:
+            stats["cache"] = self.cache.info()
+        return stats
+
+
+async def _read_pdf_upload(request):
+    """Accepts either a raw PDF body or a multipart form with a 'file' field."""
+    if request.content_type.startswith("multipart/"):
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == "file":
+                return await part.read(decode=False)
+        raise web.HTTPBadRequest(text="Multipart upload must include a 'file' field.")
+    return await request.read()
+
+
+async def _handle_upload(request, with_report):
+    service = request.app["service"]
+    service.counters["requests"] += 1
+    start = time.perf_counter()
+
+    pdf_bytes = await _read_pdf_upload(request)
+    if not pdf_bytes.startswith(b"%PDF"):
+        service.counters["failed"] += 1
+        raise web.HTTPBadRequest(text="Request body is not a PDF.")
+
+    try:
+        data, report = await service.parse(pdf_bytes, with_report)
+    except web.HTTPException:
+        raise
+    except Exception as e:
+        service.counters["failed"] += 1
+        raise web.HTTPInternalServerError(text=f"An error occurred during parsing: {e}")
+
+    if data is None:
+        service.counters["failed"] += 1
+        raise web.HTTPUnprocessableEntity(text="Could not read text from PDF.")
+
+    service.counters["completed"] += 1
+    service.latencies.append(time.perf_counter() - start)
+    if with_report:
+        return web.Response(body=report, content_type="application/pdf")
+    return web.json_response(data)
+
+
+async def handle_parse(request):
+    return await _handle_upload(request, with_report=False)
+
+
+async def handle_report(request):
+    return await _handle_upload(request, with_report=True)
+
+
+async def handle_health(request):
+    return web.json_response({"status": "ok"})
+
+
+async def handle_metrics(request):
+    return web.json_response(request.app["service"].snapshot())
+
+
+def create_app(workers=None, max_queue=64, engine="auto", cache_dir=DEFAULT_CACHE_DIR, timeout=None):
+    app = web.Application(client_max_size=MAX_UPLOAD_BYTES)
+
+    async def start_service(app):
+        cache = ResultCache(cache_dir) if cache_dir else None
+        app["service"] = ParserService(workers or os.cpu_count() or 1, max_queue,
+                                       engine=engine, cache=cache, timeout=timeout)
+
+    async def stop_service(app):
+        app["service"].pool.shutdown(cancel_futures=True)
+
+    app.on_startup.append(start_service)
+    app.on_cleanup.append(stop_service)
+    app.router.add_post("/parse", handle_parse)
+    app.router.add_post("/report", handle_report)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async HTTP credit card statement parser")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parser processes (default: CPU count)")
+    parser.add_argument("--max-queue", type=int, default=64,
+                        help="Uploads allowed to wait for a worker before 503s are returned")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Seconds before a parse is abandoned with 504")
+    parser.add_argument("--engine", choices=ENGINES, default="auto")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    app = create_app(workers=args.workers, max_queue=args.max_queue, engine=args.engine,
+                     cache_dir=None if args.no_cache else args.cache_dir, timeout=args.timeout)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import pytest
+
+from modules.categorizer import DEFAULT_RULES, Categorizer
+
+
+@pytest.fixture(scope="module")
+def categorizer():
+    return Categorizer()
+
+
+@pytest.mark.parametrize("description, expected", [
+    ("PAYMENT RECEIVED - THANK YOU", ("payment", "credit")),
+    ("AUTOPAY PAYMENT", ("payment", "credit")),
+    ("AMAZON MKTPLACE RETURN", ("refund", "credit")),
+    ("LATE PAYMENT FEE", ("fees", "debit")),
+    ("LATE FEE", ("fees", "debit")),
+    ("PAYMENT RETURNED FEE", ("fees", "debit")),
+    ("RETURNED PAYMENT", ("fees", "debit")),
+    ("PAYMENT PROCESSING FEE", ("fees", "debit")),
+    ("INTEREST CHARGE ON PURCHASES", ("fees", "debit")),
+    ("PURCHASE INTEREST", ("fees", "debit")),
+    ("LATE FEE REVERSAL", ("refund", "credit")),
+    ("ANNUAL FEE WAIVER", ("refund", "credit")),
+    ("UBER EATS ORDER", ("dining", None)),
+    ("UBER TRIP", ("transport", None)),
+    ("SOMETHING UNKNOWN", ("uncategorized", None)),
+])
+def test_classify(categorizer, description, expected):
+    assert categorizer.classify(description) == expected
+
+
+def test_rules_change_the_digest():
+    assert Categorizer().digest == Categorizer().digest
+    assert Categorizer(dict(DEFAULT_RULES, starbucks=("coffee", None))).digest != Categorizer().digest
+
+
+def test_cache_key_depends_on_the_active_rules(monkeypatch):
+    import modules.categorizer as categorizer
+    from modules.pipeline import cache_key
+
+    before = cache_key(b"%PDF-1.4 statement")
+    monkeypatch.setattr(categorizer, "_default_categorizer", Categorizer(dict(DEFAULT_RULES, starbucks=("coffee", None))))
+    assert cache_key(b"%PDF-1.4 statement") != before
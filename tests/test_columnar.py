@@ -0,0 +1,20 @@
+from modules.columnar import TransactionTable
+
+
+def _table():
+    return TransactionTable.from_records([
+        {"date": "01/02/2024", "description": "COFFEE", "amount": "4.50", "type": "debit", "category": None},
+        {"date": "01/03/2024", "description": "ADJUSTMENT", "amount": "2.00", "type": None, "category": None},
+        {"date": "01/04/2024", "description": "PAYMENT", "amount": "100.00", "type": "credit", "category": None},
+    ])
+
+
+def test_unknown_type_reads_back_as_none():
+    table = _table()
+    assert [row["type"] for row in table] == ["debit", None, "credit"]
+    assert table[1]["type"] is None
+
+
+def test_unknown_type_survives_arrow_round_trip():
+    table, _ = TransactionTable.from_arrow(_table().to_arrow())
+    assert [row["type"] for row in table] == ["debit", None, "credit"]
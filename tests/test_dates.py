@@ -0,0 +1,23 @@
+import pandas as pd
+
+from modules.table_extractor import _parse_dates, date_format
+
+
+def test_day_first_column_is_parsed_with_one_format():
+    dates = _parse_dates(pd.Series(["05/10/2025", "15/10/2025", "28/09/2025"]))
+    assert dates.dt.strftime("%Y-%m-%d").tolist() == ["2025-10-05", "2025-10-15", "2025-09-28"]
+
+
+def test_month_first_column_is_parsed_with_one_format():
+    dates = _parse_dates(pd.Series(["05/10/2025", "10/25/2025"]))
+    assert dates.dt.strftime("%Y-%m-%d").tolist() == ["2025-05-10", "2025-10-25"]
+
+
+def test_ambiguous_column_reads_month_first():
+    assert date_format(["05/10/2025", "06/10/2025"]) == "%m/%d/%Y"
+
+
+def test_stray_rows_do_not_change_the_format():
+    dates = _parse_dates(pd.Series(["05/10/2025", "15/10/2025", "Page 1 of 3", ""]))
+    assert dates[:2].dt.strftime("%Y-%m-%d").tolist() == ["2025-10-05", "2025-10-15"]
+    assert dates[2:].isna().all()
@@ -0,0 +1,55 @@
+from modules.fingerprints import FingerprintIndex, header_key
+
+
+def _statement(transactions, period=("01/10/2025", "31/10/2025"), total="30.00"):
+    return {
+        "card_last4": "1234",
+        "statement_period": {"from": period[0], "to": period[1]},
+        "total_due": total,
+        "transactions": [{"date": d, "description": desc, "amount": amount, "type": "debit"}
+                         for d, desc, amount in transactions],
+    }
+
+
+def test_key_fields_and_parsed_statement_share_a_header_key():
+    key_fields = {"card_last4": "1234", "statement_period_from": "01/10/2025",
+                  "statement_period_to": "31/10/2025", "total_due": "30.00"}
+    assert header_key(key_fields) == header_key(_statement([]))
+
+
+def test_duplicate_statement_is_rejected():
+    index = FingerprintIndex(path=None)
+    statement = _statement([("05/10/2025", "COFFEE", "10.00"), ("15/10/2025", "BOOKS", "20.00")])
+    assert index.ingest(statement) == (statement, 0)
+    assert index.ingest(dict(statement)) == (None, 0)
+    assert index.is_duplicate(statement)
+
+
+def test_overlapping_transactions_are_dropped():
+    index = FingerprintIndex(path=None)
+    index.ingest(_statement([("05/10/2025", "COFFEE", "10.00"), ("28/10/2025", "BOOKS", "20.00")]))
+    later = _statement([("28/10/2025", "BOOKS", "20.00"), ("03/11/2025", "TAXI", "7.50")],
+                       period=("15/10/2025", "14/11/2025"), total="27.50")
+    kept, overlaps = index.ingest(later)
+    assert overlaps == 1
+    assert [t["description"] for t in kept["transactions"]] == ["TAXI"]
+
+
+def test_identical_rows_within_a_statement_are_all_kept():
+    index = FingerprintIndex(path=None)
+    statement = _statement([("05/10/2025", "COFFEE", "4.00"), ("05/10/2025", "COFFEE", "4.00")])
+    kept, overlaps = index.ingest(statement)
+    assert overlaps == 0 and len(kept["transactions"]) == 2
+
+
+def test_index_is_not_saved_when_the_block_fails(tmp_path):
+    path = str(tmp_path / "index.npz")
+    statement = _statement([("05/10/2025", "COFFEE", "10.00")])
+    try:
+        with FingerprintIndex(path) as index:
+            index.ingest(statement)
+            raise RuntimeError("store failed")
+    except RuntimeError:
+        pass
+    with FingerprintIndex(path) as index:
+        assert index.ingest(statement) == (statement, 0)
@@ -0,0 +1,31 @@
+from modules.store import TransactionStore, iso_date, statement_date_formats
+
+
+def _statement(dates, period=("01/10/2025", "31/10/2025"), due="15/11/2025"):
+    return {
+        "source": "statement.pdf",
+        "card_last4": "1234",
+        "statement_period": {"from": period[0], "to": period[1]},
+        "payment_due_date": due,
+        "total_due": "10.00",
+        "transactions": [{"date": d, "description": "COFFEE", "amount": "1.00", "type": "debit"} for d in dates],
+    }
+
+
+def test_day_first_statement_is_stored_day_first():
+    with TransactionStore(":memory:") as store:
+        store.ingest([_statement(["05/10/2025", "15/10/2025", "28/10/2025"])])
+        dates = [row[0] for row in store._conn.execute("SELECT date FROM transactions ORDER BY id")]
+        period = store._conn.execute("SELECT period_start, period_end, payment_due_date FROM statements").fetchone()
+    assert dates == ["2025-10-05", "2025-10-15", "2025-10-28"]
+    assert period == ("2025-10-01", "2025-10-31", "2025-11-15")
+
+
+def test_header_dates_get_their_own_format_when_transactions_differ():
+    data = _statement(["2025-10-05", "2025-10-15"], period=("01/10/2025", "31/10/2025"), due="15/11/2025")
+    assert statement_date_formats(data) == ("%d/%m/%Y", "%Y-%m-%d")
+
+
+def test_iso_date_without_format_reads_month_first():
+    assert iso_date("05/10/2025") == "2025-05-10"
+    assert iso_date("05/10/2025", "%d/%m/%Y") == "2025-10-05"
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from modules.table_extractor import normalize_transactions
+
+
+def _raw(rows):
+    return pd.DataFrame([["Date", "Description", "Amount"]] + rows)
+
+
+def test_rows_around_the_table_are_dropped():
+    frame = normalize_transactions(_raw([
+        ["09/05/2025", "STARBUCKS COFFEE", "5.75"],
+        ["09/12/2025", "AMAZON MKTPLACE", "150.00"],
+        ["", "Total purchases", "155.75"],
+        ["Rewards summary", "Points earned", "1,250"],
+        ["Questions?", "Call customer service at 1-800-555-0100", "1-800-555-0100"],
+    ]), "test")
+    assert frame["description"].tolist() == ["STARBUCKS COFFEE", "AMAZON MKTPLACE"]
+    assert frame["amount_minor"].tolist() == [575, 15000]
+
+
+def test_unrecognized_date_style_keeps_rows():
+    frame = normalize_transactions(_raw([["Sep 5", "COFFEE", "5.75"], ["Sep 12", "BOOKS", "20.00"]]), "test")
+    assert len(frame) == 2 and frame["date"].isna().all()
@@ -0,0 +1,32 @@
+from modules.text_parser import extract_key_fields
+
+PAGE_1 = ("Global Trust Bank\nCard Number: XXXX XXXX XXXX 1234\n"
+          "Statement Period: 09/01/2025 to 09/30/2025\nPayment Due Date: 10/20/2025\n")
+PAGE_2 = "Total Amount Due: $1,234.56\nMinimum Payment Due: $50.00\n"
+
+
+def test_fields_are_collected_across_pages():
+    data = extract_key_fields(iter([PAGE_1, PAGE_2]))
+    assert data == {
+        "card_last4": "1234",
+        "statement_period_from": "09/01/2025",
+        "statement_period_to": "09/30/2025",
+        "payment_due_date": "10/20/2025",
+        "total_due": "1234.56",
+        "minimum_due": "50.00",
+        "issuer": "global_trust",
+    }
+
+
+def test_first_match_wins_and_missing_fields_stay_none():
+    data = extract_key_fields("Total Amount Due: $10.00\nNew Balance: $20.00\n")
+    assert data["total_due"] == "10.00"
+    assert data["minimum_due"] is None and data["issuer"] == "generic"
+
+
+def test_reading_stops_once_every_field_is_found():
+    def pages():
+        yield PAGE_1 + PAGE_2
+        raise AssertionError("read past the last needed page")
+
+    assert extract_key_fields(pages())["minimum_due"] == "50.00"